@@ -0,0 +1,59 @@
+# This file measures how many scenarios per second make_pred_batch scores at different batch sizes,
+# against scoring them one at a time with make_pred, and checks that both give the same values
+# Usage: python -m CodeBase.Benchmarks.batch_pred_benchmark [batch sizes...]
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from autogluon.tabular import TabularPredictor
+from CodeBase.Data.storage import load_total_data
+from CodeBase.Model.logistic_model import RINYModel
+from CodeBase.Model.linear_model import YURModel
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+SINGLE_ROW_CALLS = 50
+
+base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+total_data_path = os.path.join(base_dir, 'Data', 'total_data.csv')
+models_dir = os.path.join(base_dir, 'Model', 'saved_models', 'AutogluonModels')
+
+
+# random scenarios drawn uniformly from the range each input takes in the historical data
+def make_scenarios(total_data, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {'house': 'housing_climb_change', 'cpi': '36_mo_cpi_change_all', 'yd': 'yield_diff',
+               'ysr': 'years_since_recession', 'un': 'un_rate'}
+    return {arg: rng.uniform(total_data[column].min(), total_data[column].max(), n_rows)
+            for arg, column in columns.items()}
+
+
+def run_benchmark(batch_sizes=BATCH_SIZES):
+    total_data = load_total_data(total_data_path)
+    riny = RINYModel(total_data, model=TabularPredictor.load(os.path.join(models_dir, 'riny_model')),
+                     cache_size=0)
+    yur = YURModel(total_data, model=TabularPredictor.load(os.path.join(models_dir, 'yur_model')), cache_size=0)
+    results = []
+    for name, model in [('RINY', riny), ('YUR', yur)]:
+        scenarios = make_scenarios(total_data, SINGLE_ROW_CALLS)
+        start = time.perf_counter()
+        single = np.array([model.make_pred(*[scenarios[arg][i] for arg in ['house', 'cpi', 'yd', 'ysr', 'un']])
+                           for i in range(SINGLE_ROW_CALLS)])
+        single_time = time.perf_counter() - start
+        batch = model.make_pred_batch(**scenarios)
+        assert np.array_equal(single, batch), name + ' batch predictions differ from make_pred'
+        results.append({'model': name, 'batch_size': 'make_pred', 'rows_per_s': SINGLE_ROW_CALLS / single_time})
+
+        for batch_size in batch_sizes:
+            scenarios = make_scenarios(total_data, batch_size)
+            start = time.perf_counter()
+            model.make_pred_batch(**scenarios)
+            results.append({'model': name, 'batch_size': batch_size,
+                            'rows_per_s': batch_size / (time.perf_counter() - start)})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    batch_sizes = [int(n) for n in sys.argv[1:]] or BATCH_SIZES
+    print(run_benchmark(batch_sizes).to_string(index=False))
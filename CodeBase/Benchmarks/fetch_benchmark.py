@@ -0,0 +1,65 @@
+# This file measures the concurrent fetch stage in get_data.py without network access
+# A local stub server answers every source after a fixed delay, standing in for FRED, fredgraph and multpl.com
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import CodeBase.Data.get_data as get_data
+
+LATENCY = 0.5
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        body = ('stub response for ' + self.path).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch_stub(url, timeout=None):
+    return requests.get(url, timeout=timeout).content
+
+
+def get_stub_sources(port):
+    return {name: partial(fetch_stub, 'http://127.0.0.1:' + str(port) + '/' + name)
+            for name in get_data.get_sources()}
+
+
+def run_benchmark():
+    server = start_stub_server()
+    sources = get_stub_sources(server.server_address[1])
+
+    start = time.perf_counter()
+    sequential = {name: get_data.fetch_with_retries(fetch, 10) for name, fetch in sources.items()}
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    concurrent = get_data.fetch_all(sources)
+    concurrent_time = time.perf_counter() - start
+
+    server.shutdown()
+    assert sequential == concurrent
+    return sequential_time, concurrent_time
+
+
+if __name__ == "__main__":
+    sequential_time, concurrent_time = run_benchmark()
+    print('Sources: ', len(get_data.get_sources()), ' Latency per source: ', LATENCY)
+    print('Sequential fetch: ', round(sequential_time, 3), 's')
+    print('Concurrent fetch: ', round(concurrent_time, 3), 's')
+    print('Speedup: ', round(sequential_time / concurrent_time, 2), 'x')
@@ -0,0 +1,106 @@
+# This file times each stage of the get_data.py pipeline on synthetic sources of configurable length and frequency
+# and reports time and peak traced memory per stage as JSON, so runs on different commits can be compared
+# Usage: python -m CodeBase.Benchmarks.pipeline_benchmark --start 1900-01-01 --freq D --output results.json
+#        python -m CodeBase.Benchmarks.pipeline_benchmark --compare old.json new.json
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import pandas as pd
+import CodeBase.Data.get_data as get_data
+import CodeBase.Data.transforms as transforms
+from CodeBase.Benchmarks.synthetic_sources import make_sources, as_sources
+
+
+# runs func once for its time and once under tracemalloc for its peak memory, returning its result
+def measure(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, {'seconds': seconds, 'peak_mb': peak / 2 ** 20}
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(start='1948-01-01', freq='MS', latency=0.):
+    raw = make_sources(start=start, freq=freq)
+    sources = {name: (lambda fetch: (lambda timeout=None: time.sleep(latency) or fetch()))(fetch)
+               for name, fetch in as_sources(raw).items()}
+    stages = {}
+
+    raw, stages['fetch'] = measure(get_data.fetch_all, sources)
+    tables = {}
+    for name, builder, inputs in [('unemp', get_data.get_unemp_table, [raw['UNRATE']]),
+                                  ('mhp', get_data.get_mhp_table, [raw['MSPUS']]),
+                                  ('cpi', get_data.get_cpi_table, [raw['CPI']]),
+                                  ('sp', get_data.get_sp_table, [raw['SP']]),
+                                  ('yield', get_data.get_yield_table, [raw['DGS10'], raw['DGS1']])]:
+        tables[name], stages['table_' + name] = measure(builder, *inputs)
+    total_data, stages['merge'] = measure(get_data.merge_tables, tables)
+    _, stages['labels'] = measure(get_data.add_labels, total_data.copy())
+
+    # the builders cut everything down to the monthly date grid, so the transforms and the label engine
+    # are also timed over the full synthetic series to show how they scale with input length
+    series = raw['UNRATE']
+    _, stages['transforms_full_series'] = measure(
+        lambda: [transforms.lag_diff(series, 12), transforms.second_order_change(series, 12),
+                 transforms.rolling_window(series, 12)])
+    _, stages['labels_full_series'] = measure(get_data.recession_calendar.get_labels,
+                                              series.index.strftime('%Y-%m-%d').values)
+
+    return {'commit': get_commit(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'config': {'start': start, 'freq': freq, 'latency': latency, 'series_rows': len(series)},
+            'stages': stages}
+
+
+# prints the time and memory ratio (new / old) of every stage in two saved results
+def compare(old, new):
+    rows = []
+    for stage, new_stage in new['stages'].items():
+        old_stage = old['stages'].get(stage)
+        if old_stage is None:
+            continue
+        rows.append({'stage': stage, 'old_s': old_stage['seconds'], 'new_s': new_stage['seconds'],
+                     'time_ratio': new_stage['seconds'] / old_stage['seconds'],
+                     'old_peak_mb': old_stage['peak_mb'], 'new_peak_mb': new_stage['peak_mb']})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--start', default='1948-01-01', help='first date of the synthetic series')
+    parser.add_argument('--freq', default='MS', help="pandas frequency of the synthetic series, 'MS' to 'D'")
+    parser.add_argument('--latency', type=float, default=0., help='seconds each stub source waits')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two saved results')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            print(compare(json.load(f_old), json.load(f_new)).to_string(index=False))
+    else:
+        results = run_benchmark(args.start, args.freq, args.latency)
+        print(pd.DataFrame(results['stages']).T.to_string())
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,77 @@
+# This file benchmarks the bulk S&P 500 table parser in get_data.py against the old row-by-row parser
+# Usage: python -m CodeBase.Benchmarks.sp_parse_benchmark [saved multpl.com page] [row counts...]
+# The data rows of the saved page are repeated to reach each row count
+import datetime
+import re
+import sys
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+import CodeBase.Data.get_data as get_data
+
+ROW_COUNTS = [1000, 5000, 20000]
+
+sample_page = ('<html><body><table id="datatable"><tr><th>Date</th><th>Price</th></tr>' +
+               '<tr><td>Feb 1, 2022</td><td>\n4,435.45\n</td></tr>' +
+               '<tr><td>Jan 1, 2022</td><td>\n4,573.82\n</td></tr>' +
+               '<tr><td>Dec 1, 2021</td><td>\n4,674.77\n</td></tr>' +
+               '</table></body></html>').encode('utf-8')
+
+
+# the parser as it was written in get_sp_table before the bulk path
+def legacy_parse(page_content):
+    soup = BeautifulSoup(page_content, 'html.parser')
+    table = soup.find(id='datatable')
+    sp = pd.DataFrame(columns=['date', 'average_sp_price'])
+    dt = table.find_all('tr')
+    for i in range(2, len(dt)):
+        info = dt[i].find_all('td')
+        date = info[0].text
+        date = datetime.datetime.strptime(date, '%b %d, %Y').strftime('%Y-%m-%d')
+        price = info[1].text.replace('\n', '').replace(',', '')
+        sp = sp.append({'date': date, 'average_sp_price': float(price)}, ignore_index=True)
+    return sp
+
+
+def bulk_parse(page_content):
+    dates, prices = get_data.parse_sp_page(page_content)
+    return pd.DataFrame({'date': pd.to_datetime(dates, format='%b %d, %Y').strftime('%Y-%m-%d'),
+                         'average_sp_price': pd.Series(prices).str.replace(',', '').str.strip().astype(float)})
+
+
+# repeats the data rows of the page (everything after the first two rows) until it has n_rows of them
+def replicate_page(page_content, n_rows):
+    html = page_content.decode('utf-8')
+    rows = re.findall(r'<tr.*?</tr>', html, flags=re.S)
+    head, data = rows[:2], rows[2:]
+    table = ''.join(head + [data[i % len(data)] for i in range(n_rows)])
+    return ('<html><body><table id="datatable">' + table + '</table></body></html>').encode('utf-8')
+
+
+def run_benchmark(page_content, row_counts=ROW_COUNTS):
+    results = []
+    for n_rows in row_counts:
+        page = replicate_page(page_content, n_rows)
+        start = time.perf_counter()
+        legacy = legacy_parse(page)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        bulk = bulk_parse(page)
+        bulk_time = time.perf_counter() - start
+        assert (legacy['date'].values == bulk['date'].values).all()
+        assert (legacy['average_sp_price'].astype(float).values == bulk['average_sp_price'].values).all()
+        results.append({'rows': n_rows, 'legacy_s': legacy_time, 'bulk_s': bulk_time,
+                        'speedup': legacy_time / bulk_time,
+                        'backend': 'lxml' if get_data.lxml_html is not None else 'html.parser'})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            page_content = f.read()
+    else:
+        page_content = sample_page
+    row_counts = [int(n) for n in sys.argv[2:]] or ROW_COUNTS
+    print(run_benchmark(page_content, row_counts).to_string(index=False))
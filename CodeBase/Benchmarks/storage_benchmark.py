@@ -0,0 +1,63 @@
+# This file compares loading the total table from CSV and from the typed Parquet copy
+# Each load runs in a fresh process so the resident memory it adds can be measured
+# pyarrow is imported before measuring, so its one-off library load is not counted against the Parquet reads
+# Usage: python -m CodeBase.Benchmarks.storage_benchmark [path to total_data.csv] [row multipliers...]
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+import CodeBase.Data.storage as storage
+
+MULTIPLIERS = [1, 10, 100]
+default_csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data', 'total_data.csv')
+
+load_script = '''
+import json, sys, time
+import psutil
+import pandas as pd
+if sys.argv[1] != 'csv':
+    import pyarrow.parquet
+process = psutil.Process()
+rss_before = process.memory_info().rss
+start = time.perf_counter()
+if sys.argv[1] == 'csv':
+    total_data = pd.read_csv(sys.argv[2], index_col=0)
+else:
+    total_data = pd.read_parquet(sys.argv[2], columns=json.loads(sys.argv[3]))
+load_time = time.perf_counter() - start
+print(json.dumps({'load_s': load_time, 'rss_mb': (process.memory_info().rss - rss_before) / 2 ** 20,
+                  'frame_mb': total_data.memory_usage(deep=True).sum() / 2 ** 20}))
+'''
+
+
+def measure(kind, path, columns=None):
+    output = subprocess.run([sys.executable, '-c', load_script, kind, path, json.dumps(columns)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def run_benchmark(csv_path=default_csv_path, multipliers=MULTIPLIERS):
+    total_data = pd.read_csv(csv_path, index_col=0)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for multiplier in multipliers:
+            path = os.path.join(tmp_dir, 'total_data_' + str(multiplier) + '.csv')
+            storage.save_total_data(pd.concat([total_data] * multiplier, ignore_index=True), path)
+            parquet_path = storage.get_parquet_path(path)
+            runs = [('csv', measure('csv', path)),
+                    ('parquet', measure('parquet', parquet_path)),
+                    ('parquet, 3 columns', measure('parquet', parquet_path, ['date', 'un_rate', 'yield_diff']))]
+            for kind, result in runs:
+                result.update({'rows': len(total_data) * multiplier, 'format': kind,
+                               'file_mb': os.path.getsize(parquet_path if kind != 'csv' else path) / 2 ** 20})
+                results.append(result)
+    return pd.DataFrame(results)[['rows', 'format', 'file_mb', 'load_s', 'rss_mb', 'frame_mb']]
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else default_csv_path
+    multipliers = [int(m) for m in sys.argv[2:]] or MULTIPLIERS
+    print(run_benchmark(csv_path, multipliers).to_string(index=False))
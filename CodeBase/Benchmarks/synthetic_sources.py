@@ -0,0 +1,56 @@
+# This file generates synthetic raw responses in the same formats the real upstream sources return,
+# so the pipeline in get_data.py can be run at any length and frequency without network access
+import datetime
+
+import numpy as np
+import pandas as pd
+
+
+# random walk around `level`, rounded like the published series
+def random_walk(index, level, step, decimals, rng):
+    return pd.Series(np.round(level + rng.normal(0, step, len(index)).cumsum(), decimals), index=index)
+
+
+# returns a dict of raw responses keyed like get_data.get_sources()
+# start/end: 'YYYY-MM-DD' span of every series, end defaults to today
+# freq: pandas frequency of the unemployment, CPI and S&P series ('MS' for monthly up to 'D' for daily)
+# the housing series is quarterly and the yields are business daily unless freq is finer
+def make_sources(start='1948-01-01', end=None, freq='MS', seed=0):
+    rng = np.random.default_rng(seed)
+    if end is None:
+        end = datetime.datetime.today().strftime('%Y-%m-%d')
+    index = pd.date_range(start, end, freq=freq)
+    quarters = pd.date_range(start, end, freq='QS') if freq in ['MS', 'QS'] else index
+    days = pd.bdate_range(start, end) if freq != 'D' else index
+
+    yield_ten = random_walk(days, 5, 0.005, 2, rng)
+    yield_ten[rng.random(len(days)) < 0.03] = np.nan
+    yield_one = random_walk(days, 4, 0.005, 2, rng)
+    yield_one[rng.random(len(days)) < 0.03] = np.nan
+    house = pd.Series(np.round(18000 * np.exp(rng.normal(0.01, 0.02, len(quarters)).cumsum()), -2), index=quarters)
+
+    cpi_index = index[index < pd.Timestamp(end) - pd.DateOffset(months=1)]
+    cpi = 'DATE,CPIAUCSL_PC1,CPILFESL_PC1\n' + ''.join(
+        date + ',' + str(a) + ',' + str(b) + '\n' for date, a, b in
+        zip(cpi_index.strftime('%Y-%m-%d'), np.round(3 + rng.normal(0, 1, len(cpi_index)), 5),
+            np.round(3 + rng.normal(0, 1, len(cpi_index)), 5)))
+
+    # multpl.com lists the newest month first, after a header row and the current estimate
+    sp_index = index[::-1]
+    sp_prices = 100 * np.exp(rng.normal(0, 0.03, len(sp_index)).cumsum())
+    sp_rows = ''.join('<tr><td>' + date + '</td><td>\n' + '{:,.2f}'.format(price) + '\n</td></tr>'
+                      for date, price in zip(sp_index.strftime('%b %d, %Y').str.replace(' 0', ' '), sp_prices))
+    sp = ('<html><body><table id="datatable"><tr><th>Date</th><th>Price</th></tr>' + sp_rows +
+          '</table></body></html>').encode('utf-8')
+
+    return {'UNRATE': random_walk(index, 5, 0.02, 1, rng),
+            'MSPUS': house,
+            'DGS10': yield_ten,
+            'DGS1': yield_one,
+            'CPI': cpi,
+            'SP': sp}
+
+
+# wraps the raw responses as fetch callables for get_data.fetch_all
+def as_sources(raw):
+    return {name: (lambda payload: (lambda timeout=None: payload))(payload) for name, payload in raw.items()}
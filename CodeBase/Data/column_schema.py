@@ -0,0 +1,73 @@
+# This file contains a schema of the total table's columns, built once per data version, so the dashboard looks up
+# each column's kind, range and display label instead of scanning the column on every request
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def get_display_label(column):
+    return column.replace('_', ' ').title()
+
+
+# returns the kind of a column: 'date', 'binary' (only 0, 1 and missing values), 'continuous' or 'categorical'
+def get_kind(name, values):
+    if name == 'date':
+        return 'date'
+    if not pd.api.types.is_numeric_dtype(values):
+        return 'categorical'
+    if ((values == 0) | (values == 1) | (values != values)).all():
+        return 'binary'
+    return 'continuous'
+
+
+class ColumnSchema:
+
+    # prediction_columns: columns added to the table by the models rather than data
+    def __init__(self, total_data, data_version=None, prediction_columns=()):
+        self.data_version = data_version
+        self.columns = {}
+        for name in total_data.columns:
+            values = total_data[name].values
+            column = {'dtype': str(total_data[name].dtype), 'kind': get_kind(name, values),
+                      'missing_ratio': float(pd.isnull(values).mean()) if len(values) else 0.,
+                      'label': get_display_label(name),
+                      'is_prediction': name in prediction_columns,
+                      'min': None, 'max': None}
+            if column['kind'] in ['binary', 'continuous'] and column['missing_ratio'] < 1:
+                column['min'], column['max'] = float(np.nanmin(values)), float(np.nanmax(values))
+            elif column['kind'] == 'date' and len(values):
+                column['min'], column['max'] = str(min(values)), str(max(values))
+            self.columns[name] = column
+
+    def get(self, column):
+        return self.columns[column]
+
+    def is_binary(self, column):
+        return self.columns[column]['kind'] == 'binary'
+
+    # the display label, falling back to the usual formatting for columns not in the schema (Ex. combined_feature)
+    def get_label(self, column):
+        if column in self.columns:
+            return self.columns[column]['label']
+        return get_display_label(column)
+
+    # dropdown options for the data columns, leaving out the model prediction columns unless asked for
+    def get_options(self, include_predictions=False):
+        return [{"label": column['label'], "value": name} for name, column in self.columns.items()
+                if include_predictions or not column['is_prediction']]
+
+
+# keeps the schema of the current data version, rebuilding it when the version changes
+class SchemaRegistry:
+
+    def __init__(self, prediction_columns=()):
+        self.prediction_columns = prediction_columns
+        self.schema = None
+        self.lock = threading.Lock()
+
+    def get(self, total_data, data_version):
+        with self.lock:
+            if self.schema is None or self.schema.data_version != data_version:
+                self.schema = ColumnSchema(total_data, data_version, self.prediction_columns)
+            return self.schema
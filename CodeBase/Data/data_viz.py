@@ -1,6 +1,10 @@
 # This file will hold methods for visualizing data
 import datetime
+import threading
+import numpy as np
+import pandas as pd
 import plotly.express as px
+from cachetools import LRUCache
 import CodeBase.Data.get_data as get_data
 from plotly.subplots import make_subplots
 
@@ -9,20 +13,111 @@ recession_starts = ['1960-04-01', '1969-12-01', '1973-11-01', '1980-01-01', '198
 recession_ends = ['1961-02-01', '1970-11-01', '1975-03-01', '1980-07-01', '1982-11-01',
                   '1991-03-01', '2001-11-01', '2009-06-01', '2020-04-01']
 
+# the most year range and recession buckets whose normalization statistics are kept, least recently used go first
+norm_stats_size = 64
+
+
+# merges the per-column count, mean and variance (ddof=1) of two sets of rows into those of both together
+def merge_stats(a, b):
+    n = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    mean = a['mean'] + (delta * b['count'] / n).fillna(0)
+    m2 = (a['var'] * (a['count'] - 1)).fillna(0) + (b['var'] * (b['count'] - 1)).fillna(0) + \
+        (delta ** 2 * a['count'] * b['count'] / n).fillna(0)
+    merged = pd.DataFrame({'count': n, 'mean': mean.where(a['count'] > 0, b['mean']), 'var': m2 / (n - 1)})
+    merged.loc[n < 2, 'var'] = np.nan
+    return merged
+
+
+def get_stats(rows):
+    numeric = rows.select_dtypes('number')
+    return pd.DataFrame({'count': numeric.count(), 'mean': numeric.mean(), 'var': numeric.var()})
+
 
 class Visualizer:
 
-    def __init__(self, df=None):
+    # schema: a ColumnSchema of the table, whose display labels are used for the axes when set
+    def __init__(self, df=None, schema=None):
+        self.schema = schema
+        self.set_data(df)
+
+    def get_label(self, column):
+        if self.schema is not None:
+            return self.schema.get_label(column)
+        return column.replace('_', ' ').title()
+
+    # keeps the table and the row positions of its dates in date order, for all rows and for the rows outside
+    # a recession, so a year range becomes two binary searches instead of comparing every date string
+    def set_data(self, df):
         self.total_data = df
+        # per-column normalization statistics of each (start_date, end_date, in_rec) bucket, see get_norm_stats
+        self.norm_stats = LRUCache(maxsize=norm_stats_size)
+        self.stats_lock = threading.Lock()
+        if df is not None:
+            self.build_index()
+
+    def build_index(self):
+        df = self.total_data
+        dates = pd.to_datetime(df['date']).values
+        self.rows = np.argsort(dates, kind='stable')
+        self.row_dates = dates[self.rows]
+        if 'in_recession' in df.columns:
+            self.no_rec_rows = self.rows[df['in_recession'].values[self.rows] == 0]
+            self.no_rec_dates = dates[self.no_rec_rows]
+
+    # returns the rows dated from start_date to end_date (inclusive), leaving out recessions unless in_rec is checked
+    def get_rows(self, start_date, end_date, in_rec=1):
+        if (in_rec is None) | (in_rec == []):
+            rows, dates = self.no_rec_rows, self.no_rec_dates
+        else:
+            rows, dates = self.rows, self.row_dates
+        start = np.searchsorted(dates, np.datetime64(start_date), side='left')
+        end = np.searchsorted(dates, np.datetime64(end_date), side='right')
+        return self.total_data.iloc[rows[start:end]]
+
+    # returns the mean and standard deviation of each numeric column over the rows get_rows returns,
+    # computed on first use for each year range and recession choice
+    def get_norm_stats(self, start_date, end_date, in_rec=1):
+        key = (start_date, end_date, not ((in_rec is None) | (in_rec == [])))
+        with self.stats_lock:
+            stats = self.norm_stats.get(key)
+            if stats is None:
+                stats = self.norm_stats[key] = get_stats(self.get_rows(start_date, end_date, in_rec))
+        return pd.DataFrame({'mean': stats['mean'], 'std': np.sqrt(stats['var'])})
+
+    # returns a Visualizer of the table with rows appended, whose normalization statistics are those cached here
+    # updated with only the new rows; this one is left unchanged for the requests still using it
+    def with_rows(self, new_rows):
+        visualizer = Visualizer(pd.concat([self.total_data, new_rows], ignore_index=True), self.schema)
+        with self.stats_lock:
+            for (start_date, end_date, include_rec), stats in self.norm_stats.items():
+                in_bucket = (new_rows['date'] >= start_date) & (new_rows['date'] <= end_date)
+                if not include_rec:
+                    in_bucket &= new_rows['in_recession'] == 0
+                visualizer.norm_stats[(start_date, end_date, include_rec)] = \
+                    merge_stats(stats, get_stats(new_rows[in_bucket]))
+        return visualizer
+
+    # returns a Visualizer of df, the same rows as this table with the values of columns replaced
+    # (Ex. a swapped model's predictions), recomputing the cached normalization statistics of only those columns
+    def with_columns(self, df, columns):
+        visualizer = Visualizer(df, self.schema)
+        with self.stats_lock:
+            for (start_date, end_date, include_rec), stats in self.norm_stats.items():
+                rows = visualizer.get_rows(start_date, end_date, [1] if include_rec else [])
+                visualizer.norm_stats[(start_date, end_date, include_rec)] = \
+                    pd.concat([stats.drop(columns, errors='ignore'), get_stats(rows[columns])])
+        return visualizer
 
     def makePlot(self, y, x='date', start_date='1968-01-01', end_date=datetime.datetime.today().strftime('%Y-%m-%d'),
                  df=None, horiz_line_height=0):
         if df is None:
-            df = self.total_data
-        subdata = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-        labels = {x: x.replace('_', ' ').title()}
+            subdata = self.get_rows(start_date, end_date)
+        else:
+            subdata = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+        labels = {x: self.get_label(x)}
         for it in y:
-            labels[it] = it.replace('_', ' ').title()
+            labels[it] = self.get_label(it)
         fig = px.line(subdata, x=x, y=y, labels=labels)
         fig.update_layout(title={"text": "Variable Visualization Chart", "y": 0.9})
 
@@ -47,14 +142,12 @@ class Visualizer:
     # Creates a histogram to show the distribution of data for a given feature among different labels
     def histPlot(self, feature, binary, start_date='1968-01-01',
                  end_date=datetime.datetime.today().strftime('%Y-%m-%d'), in_rec=0):
-        if (in_rec is None) | (in_rec == []):
-            cropped_data = self.total_data[self.total_data['in_recession'] == 0]
-            cropped_data = cropped_data[(cropped_data['date'] >= start_date) & (cropped_data['date'] <= end_date)]
-        else:
-            cropped_data = self.total_data[(self.total_data['date'] >= start_date) &
-                                           (self.total_data['date'] <= end_date)]
+        cropped_data = self.get_rows(start_date, end_date, in_rec)
         if len(feature) > 1:
-            cropped_data = (cropped_data-cropped_data.mean())/cropped_data.std()
+            # z-scores only the plotted columns, with the bucket's cached statistics
+            stats = self.get_norm_stats(start_date, end_date, in_rec)
+            columns = list(dict.fromkeys(feature + [binary]))
+            cropped_data = (cropped_data[columns] - stats['mean'][columns]) / stats['std'][columns]
             cropped_data['combined_feature'] = cropped_data[feature[0]] * cropped_data[feature[1]]
             for i in range(2, len(feature)):
                 cropped_data['combined_feature'] = cropped_data['combined_feature'] * cropped_data[feature[i]]
@@ -63,41 +156,31 @@ class Visualizer:
             to_plot = feature[0]
         fig = px.histogram(cropped_data, x=to_plot, color=binary,
                            labels={
-                               to_plot: to_plot.replace('_', ' ').title(),
-                               binary: binary.replace('_', ' ').title()
+                               to_plot: self.get_label(to_plot),
+                               binary: self.get_label(binary)
                            },
-                           title='Distribution of ' + to_plot.replace('_', ' ').title() + ' by ' +
-                                 binary.replace('_', ' ').title(), opacity=0.5, barmode="overlay")
+                           title='Distribution of ' + self.get_label(to_plot) + ' by ' +
+                                 self.get_label(binary), opacity=0.5, barmode="overlay")
         fig.update_layout(paper_bgcolor="rgba(0,0,0,0)")
         return fig
 
     def soloHist(self, feature, start_date='1968-01-01',
                  end_date=datetime.datetime.today().strftime('%Y-%m-%d'), in_rec=0):
-        if (in_rec is None) | (in_rec == []):
-            cropped_data = self.total_data[self.total_data['in_recession'] == 0]
-            cropped_data = cropped_data[(cropped_data['date'] >= start_date) & (cropped_data['date'] <= end_date)]
-        else:
-            cropped_data = self.total_data[(self.total_data['date'] >= start_date) &
-                                           (self.total_data['date'] <= end_date)]
+        cropped_data = self.get_rows(start_date, end_date, in_rec)
         fig = px.histogram(cropped_data, x=feature,
                            labels={
-                               feature: feature.replace('_', ' ').title()
+                               feature: self.get_label(feature)
                            },
-                           title='Distribution of ' + feature.replace('_', ' ').title())
+                           title='Distribution of ' + self.get_label(feature))
         fig.update_layout(paper_bgcolor="rgba(0,0,0,0)")
         return fig
 
     # Creates a scatter plot to show the distribution of data for a given feature among a dependent variable
     def scatPlot(self, y, x, start_date='1968-01-01', end_date=datetime.datetime.today().strftime('%Y-%m-%d'),
                  in_rec=0):
-        if (in_rec is None) | (in_rec == []):
-            cropped_data = self.total_data[self.total_data['in_recession'] == 0]
-            cropped_data = cropped_data[(cropped_data['date'] >= start_date) & (cropped_data['date'] <= end_date)]
-        else:
-            cropped_data = self.total_data[(self.total_data['date'] >= start_date) &
-                                           (self.total_data['date'] <= end_date)]
+        cropped_data = self.get_rows(start_date, end_date, in_rec)
 
-        labels = {x: x.replace('_', ' ').title()}
+        labels = {x: self.get_label(x)}
 
         fig = px.scatter(cropped_data, x=x, y=y,
                          labels=labels)
@@ -0,0 +1,66 @@
+# This file contains a bounded cache of serialized Plotly figures for the dashboard plot callback
+# Figures are stored as JSON and the cache is capped by their total size, dropping least recently used ones first
+import json
+import threading
+
+from cachetools import LRUCache
+
+missing = object()
+
+
+class FigureCache:
+
+    # max_bytes: the most JSON kept for all figures together, 0 disables the cache
+    # data_version: identifies the data the figures were drawn from, see set_data_version
+    def __init__(self, max_bytes=64 * 2 ** 20, data_version=None):
+        self.max_bytes = max_bytes
+        self.data_version = data_version
+        self.cache = self.new_cache()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def new_cache(self):
+        return LRUCache(maxsize=max(self.max_bytes, 1), getsizeof=len)
+
+    # a new data version drops every figure, none of them can be asked for again
+    def set_data_version(self, data_version):
+        with self.lock:
+            if data_version != self.data_version:
+                self.data_version = data_version
+                self.cache = self.new_cache()
+
+    # returns the figure (as a plotly figure dict) for the key, calling make_figure() on a miss
+    # key: the callback inputs, already normalized so equivalent requests share an entry
+    # count: whether the lookup counts towards the hit rate, warming up the cache does not
+    def get(self, key, make_figure, count=True):
+        with self.lock:
+            data_version = self.data_version
+            figure_json = self.cache.get((data_version, key), missing)
+            if figure_json is not missing:
+                self.hits += count
+                return json.loads(figure_json)
+            self.misses += count
+        figure_json = make_figure().to_json()
+        with self.lock:
+            # figures larger than the whole cache are not kept
+            if data_version == self.data_version and 0 < len(figure_json) <= self.max_bytes:
+                self.cache[(data_version, key)] = figure_json
+        return json.loads(figure_json)
+
+    # builds and caches the figures for these keys ahead of the first requests
+    # views: (key, make_figure) pairs
+    def warm(self, views):
+        for key, make_figure in views:
+            self.get(key, make_figure, count=False)
+
+    def clear(self):
+        with self.lock:
+            self.cache = self.new_cache()
+
+    def info(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / requests if requests else 0.,
+                    'size': len(self.cache), 'bytes': self.cache.currsize, 'max_bytes': self.max_bytes}
@@ -0,0 +1,114 @@
+# This file contains an on-disk cache for FRED series so that rebuilds only download new observations
+import datetime
+import os
+import threading
+
+import pandas as pd
+
+default_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fred_cache')
+
+
+# returns function(), raising TimeoutError if it takes longer than timeout seconds
+# fredapi has no request timeout, so the call runs on a daemon thread that is left behind if it takes too long
+def call_with_timeout(function, timeout=None):
+    if timeout is None:
+        return function()
+    result = {}
+
+    def run():
+        try:
+            result['value'] = function()
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError('FRED did not respond within ' + str(timeout) + ' seconds')
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+class FredCache:
+
+    # fred: a fredapi.Fred client, or a function returning one that is called on the first download
+    #       (may be None when offline)
+    # ttl: how long a cached 'latest' series is used before new observations are requested
+    # offline: serve only from the cache and never contact FRED
+    def __init__(self, fred, cache_dir=default_cache_dir, ttl=datetime.timedelta(hours=12), offline=False):
+        self.fred = fred
+        self.fred_lock = threading.Lock()
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+
+    # the cache holds one file per series and vintage, vintage=None is the latest release
+    def get_path(self, series_id, vintage=None):
+        return os.path.join(self.cache_dir, series_id + '_' + (vintage or 'latest') + '.csv')
+
+    def is_fresh(self, path, vintage=None):
+        # a past vintage never changes once downloaded
+        if vintage is not None:
+            return True
+        age = datetime.datetime.now() - datetime.datetime.fromtimestamp(os.path.getmtime(path))
+        return age < self.ttl
+
+    def read(self, path):
+        cached = pd.read_csv(path, index_col=0, parse_dates=True)
+        return cached[cached.columns[0]].rename(None)
+
+    # the cache directory is only made when the first series is written, not when the cache is created
+    def write(self, series, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        series.rename('value').to_csv(path, index_label='date')
+
+    # the FRED client, made the first time one is needed when fred is a function
+    def get_fred(self):
+        with self.fred_lock:
+            if callable(self.fred):
+                self.fred = self.fred()
+            return self.fred
+
+    # timeout: seconds the download may take, None waits for it
+    def fetch(self, series_id, vintage=None, observation_start=None, timeout=None):
+        kwargs = {}
+        if observation_start is not None:
+            kwargs['observation_start'] = observation_start
+        if vintage is not None:
+            kwargs['realtime_start'] = vintage
+            kwargs['realtime_end'] = vintage
+        fred = self.get_fred()
+        return call_with_timeout(lambda: fred.get_series(series_id, **kwargs), timeout)
+
+    # returns the series the same way fred.get_series does, downloading only what the cache is missing
+    # timeout: seconds each download may take
+    def get_series(self, series_id, vintage=None, timeout=None):
+        path = self.get_path(series_id, vintage)
+        if not os.path.exists(path):
+            if self.offline:
+                raise ValueError('No cached data for ' + series_id + ' and the FRED cache is offline')
+            series = self.fetch(series_id, vintage, timeout=timeout)
+            self.write(series, path)
+            return series
+
+        cached = self.read(path)
+        if self.offline or self.is_fresh(path, vintage):
+            return cached
+
+        try:
+            if len(cached) == 0:
+                new = self.fetch(series_id, vintage, timeout=timeout)
+            else:
+                # re-request the last cached date as well so a revision to it replaces the old value
+                last_date = cached.index.max().strftime('%Y-%m-%d')
+                new = self.fetch(series_id, vintage, observation_start=last_date, timeout=timeout)
+        except Exception as e:
+            # a failed refresh serves the stale cached series rather than failing the rebuild
+            print('Could not refresh', series_id, 'from FRED, using the cached series:', e)
+            return cached
+        series = pd.concat([cached, new])
+        series = series[~series.index.duplicated(keep='last')].sort_index()
+        self.write(series, path)
+        return series
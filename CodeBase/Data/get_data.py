@@ -1,26 +1,64 @@
 # This file contains methods for getting all of the data used in the model
+import argparse
 import datetime
 import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import partial
 
 import numpy as np
 import requests
 from bs4 import BeautifulSoup
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
 from fredapi import Fred
 import pandas as pd
 import warnings
 from dotenv import load_dotenv
+import CodeBase.Data.transforms as transforms
+from CodeBase.Data.fred_cache import FredCache, default_cache_dir
+from CodeBase.Data.recession_labels import RecessionCalendar
+import CodeBase.Data.storage as storage
+from CodeBase.Data.source_archive import SourceArchive
 warnings.filterwarnings('ignore')
 
 
 load_dotenv()
 fred_api_key = os.getenv('FREDapiKey')
-fred = Fred(api_key=fred_api_key)
+fred_offline = os.getenv('FREDoffline', '0') == '1'
+
+
+# the FRED client is only made when a series is actually downloaded, so replaying a SourceArchive
+# or reading the cache needs no FRED api key
+def make_fred():
+    return Fred(api_key=fred_api_key)
+
+
+fred_cache = FredCache(make_fred, cache_dir=os.getenv('FREDcacheDir', default_cache_dir),
+                       ttl=datetime.timedelta(hours=float(os.getenv('FREDcacheTTLHours', '12'))),
+                       offline=fred_offline)
 
 recession_starts = ['1960-04-01', '1969-12-01', '1973-11-01', '1980-01-01', '1981-07-01',
                     '1990-07-01', '2001-03-01', '2007-12-01', '2020-02-01']
 recession_ends = ['1961-02-01', '1970-11-01', '1975-03-01', '1980-07-01', '1982-11-01',
                   '1991-03-01', '2001-11-01', '2009-06-01', '2020-04-01']
+recession_calendar = RecessionCalendar(recession_starts, recession_ends)
+
+label_columns = ['years_since_recession', 'years_until_recession', 'recession_in_next_year', 'in_recession']
+
+# the longest lookback of any derived column (36 month CPI change)
+max_lookback = 36
+
+total_data_path = 'mysite/CodeBase/Data/total_data.csv'
+
+sp_url = 'https://www.multpl.com/s-p-500-historical-prices/table/by-month'
+
+# seconds each source may take (all attempts and the waits between them) before the fetch stage gives up on it
+fetch_timeouts = {'UNRATE': 60, 'MSPUS': 60, 'DGS10': 60, 'DGS1': 60, 'CPI': 60, 'SP': 60}
+fetch_retries = 2
 
 
 def get_using_dates():
@@ -28,16 +66,14 @@ def get_using_dates():
                                            freq='MS').strftime("%Y-%m-%d").tolist(), columns=['date'])
 
 
-def get_unemp_table():
-    unemp = fred.get_series('UNRATE')
+def get_unemp_table(unemp=None):
+    if unemp is None:
+        unemp = fetch_fred('UNRATE')
     unemp = pd.DataFrame(unemp).reset_index()
     unemp.columns = ['date', 'un_rate']
     unemp.date = unemp.date.astype(str)
     unemp = unemp[unemp['date'] >= '1965-01-01'].reset_index(drop=True)
-    unemp['12_mo_unemp_change'] = 0.
-    for i in range(12, len(unemp)):
-        change = (unemp.at[i, 'un_rate'] - unemp.at[i - 12, 'un_rate'])
-        unemp.at[i, '12_mo_unemp_change'] = change
+    unemp['12_mo_unemp_change'] = transforms.lag_diff(unemp['un_rate'], 12)
     unemp = unemp[unemp['date'] >= '1968-01-01'].reset_index(drop=True)
     print('Unemp Table Most Recent: ', unemp.iloc[-1]['date'])
     unemp = unemp.merge(get_using_dates(), how='right', on='date')
@@ -46,30 +82,23 @@ def get_unemp_table():
     return unemp
 
 
-def get_mhp_table():
-    mhp = fred.get_series('MSPUS')
+def get_mhp_table(mhp=None):
+    if mhp is None:
+        mhp = fetch_fred('MSPUS')
     mhp = pd.DataFrame(mhp).reset_index()
     mhp.columns = ['date', 'median_household_price']
     mhp.date = mhp.date.astype(str)
     mhp = mhp.merge(get_using_dates(), how='right', on='date')
     mhp.median_household_price = mhp.median_household_price.fillna(method='pad')
-    mhp['pct_house_change_year'] = 0.
-    mhp['housing_climb_change'] = 0.
-    for i in range(12, len(mhp)):
-        pct_change = ((mhp.at[i, 'median_household_price'] -
-                       mhp.at[i - 12, 'median_household_price']) /
-                      mhp.at[i - 12, 'median_household_price']) * 100
-        mhp.at[i, 'pct_house_change_year'] = pct_change
-
-        value_change = (mhp.at[i, 'pct_house_change_year'] - mhp.at[i - 12, 'pct_house_change_year'])
-        mhp.at[i, 'housing_climb_change'] = value_change
+    mhp['pct_house_change_year'] = transforms.lag_pct_change(mhp['median_household_price'], 12)
+    mhp['housing_climb_change'] = transforms.second_order_change(mhp['median_household_price'], 12)
 
     mhp = mhp[mhp['date'] >= '1968-01-01'].reset_index(drop=True)
     print('MHP Table Most Recent: ', mhp.iloc[-1]['date'])
     return mhp
 
 
-def get_cpi_table():
+def get_cpi_url():
     latest_date = datetime.datetime.today() - datetime.timedelta(1)
     ld_string = latest_date.strftime('%Y-%m-%d')
     if datetime.datetime.today().month != 1:
@@ -79,24 +108,94 @@ def get_cpi_table():
         latest_month = datetime.datetime(datetime.datetime.today().year - 1,
                                          12, 1)
     lm_string = latest_month.strftime('%Y-%m-%d')
-    cpi = requests.get('https://fred.stlouisfed.org/graph/fredgraph.csv?bgcolor=%23e1e9f0&' +
-                       'chart_type=line&drp=0&fo=open%20sans&graph_bgcolor=%23ffffff&heigh' +
-                       't=389&mode=fred&recession_bars=on&txtcolor=%23444444&ts=10&tts=10&' +
-                       'width=536&nt=0&thu=0&trc=0&show_legend=yes&show_axis_titles=yes&sh' +
-                       'ow_tooltip=yes&id=CPIAUCSL,CPILFESL&scale=left,left&cosd=1960-01-0' +
-                       '1,1960-01-01&coed=' + lm_string + ',' + lm_string + '&line_color=%' +
-                       '234572a7,%23aa4643&link_values=false,false&line_style=solid,solid&' +
-                       'mark_type=none,none&mw=1,1&lw=2,2&ost=-99999,-99999&oet=99999,9999' +
-                       '9&mma=0,0&fml=a,a&fq=Monthly,Monthly&fam=avg,avg&fgst=lin,lin&fgsn' +
-                       'd=2009-06-01,2009-06-01&line_index=1,2&transformation=pc1,pc1&vint' +
-                       'age_date=' + ld_string + ',' + ld_string + '&revision_date=' +
-                       ld_string + ',' + ld_string + '&nd=1947-01-01,1957-01-01')
-    cpi = pd.read_csv(io.StringIO(cpi.content.decode('utf-8')))
+    return ('https://fred.stlouisfed.org/graph/fredgraph.csv?bgcolor=%23e1e9f0&' +
+            'chart_type=line&drp=0&fo=open%20sans&graph_bgcolor=%23ffffff&heigh' +
+            't=389&mode=fred&recession_bars=on&txtcolor=%23444444&ts=10&tts=10&' +
+            'width=536&nt=0&thu=0&trc=0&show_legend=yes&show_axis_titles=yes&sh' +
+            'ow_tooltip=yes&id=CPIAUCSL,CPILFESL&scale=left,left&cosd=1960-01-0' +
+            '1,1960-01-01&coed=' + lm_string + ',' + lm_string + '&line_color=%' +
+            '234572a7,%23aa4643&link_values=false,false&line_style=solid,solid&' +
+            'mark_type=none,none&mw=1,1&lw=2,2&ost=-99999,-99999&oet=99999,9999' +
+            '9&mma=0,0&fml=a,a&fq=Monthly,Monthly&fam=avg,avg&fgst=lin,lin&fgsn' +
+            'd=2009-06-01,2009-06-01&line_index=1,2&transformation=pc1,pc1&vint' +
+            'age_date=' + ld_string + ',' + ld_string + '&revision_date=' +
+            ld_string + ',' + ld_string + '&nd=1947-01-01,1957-01-01')
+
+
+def fetch_fred(series_id, timeout=None):
+    return fred_cache.get_series(series_id, timeout=timeout)
+
+
+def fetch_cpi(timeout=None):
+    return requests.get(get_cpi_url(), timeout=timeout).content.decode('utf-8')
+
+
+def fetch_sp(timeout=None):
+    return requests.get(sp_url, timeout=timeout).content
+
+
+def get_sources():
+    return {'UNRATE': partial(fetch_fred, 'UNRATE'),
+            'MSPUS': partial(fetch_fred, 'MSPUS'),
+            'DGS10': partial(fetch_fred, 'DGS10'),
+            'DGS1': partial(fetch_fred, 'DGS1'),
+            'CPI': fetch_cpi,
+            'SP': fetch_sp}
+
+
+# calls fetch, retrying with exponential backoff if it raises
+# timeout: seconds for all the attempts and the waits between them together, so the retries happen within the
+# deadline fetch_all waits for; each attempt gets an even share of what the waits leave, and the waits are scaled
+# down if they would take more than half of it
+def fetch_with_retries(fetch, timeout=None, retries=fetch_retries, backoff=1.):
+    attempt_timeout = timeout
+    if timeout is not None:
+        waits = backoff * (2 ** retries - 1)
+        if waits > timeout / 2:
+            backoff *= timeout / 2 / waits
+            waits = timeout / 2
+        attempt_timeout = (timeout - waits) / (retries + 1)
+    for attempt in range(retries + 1):
+        try:
+            return fetch(timeout=attempt_timeout)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+# fetches every source at once on a thread pool and returns the raw responses keyed by source name
+# sources maps a name to a callable taking a timeout keyword, defaulting to get_sources()
+def fetch_all(sources=None, timeouts=None, retries=fetch_retries):
+    if sources is None:
+        sources = get_sources()
+    if timeouts is None:
+        timeouts = fetch_timeouts
+    pool = ThreadPoolExecutor(max_workers=len(sources))
+    try:
+        started = time.monotonic()
+        futures = {name: pool.submit(fetch_with_retries, fetch, timeouts.get(name), retries)
+                   for name, fetch in sources.items()}
+        results = {}
+        for name, future in futures.items():
+            remaining = None
+            if timeouts.get(name) is not None:
+                remaining = max(0., started + timeouts[name] - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except TimeoutError:
+                raise TimeoutError('Fetching ' + name + ' took longer than ' + str(timeouts[name]) + ' seconds')
+        return results
+    finally:
+        pool.shutdown(wait=False)
+
+
+def get_cpi_table(cpi_csv=None):
+    if cpi_csv is None:
+        cpi_csv = fetch_cpi(fetch_timeouts['CPI'])
+    cpi = pd.read_csv(io.StringIO(cpi_csv))
     cpi.columns = ['date', 'cpi_change_all', 'cpi_change_less_food_and_energy']
-    cpi['36_mo_cpi_change_all'] = 0.
-    for i in range(36, len(cpi)):
-        change = (cpi.at[i, 'cpi_change_all'] - cpi.at[i - 36, 'cpi_change_all'])
-        cpi.at[i, '36_mo_cpi_change_all'] = change
+    cpi['36_mo_cpi_change_all'] = transforms.lag_diff(cpi['cpi_change_all'], 36)
 
     cpi = cpi[cpi['date'] >= '1968-01-01'].reset_index(drop=True)
     print('CPI Table Most Recent: ', cpi.iloc[-1]['date'])
@@ -107,157 +206,170 @@ def get_cpi_table():
     return cpi
 
 
-def get_sp_table():
-    url = 'https://www.multpl.com/s-p-500-historical-prices/table/by-month'
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
-    table = soup.find(id='datatable')
-
-    sp = pd.DataFrame(columns=['date', 'average_sp_price'])
-
-    dt = table.find_all('tr')
-    for i in range(2, len(dt)):
-        info = dt[i].find_all('td')
-        date = info[0].text
-        date = datetime.datetime.strptime(date, '%b %d, %Y').strftime('%Y-%m-%d')
-        price = info[1].text.replace('\n', '').replace(',', '')
-        sp = sp.append({'date': date, 'average_sp_price': float(price)}, ignore_index=True)
-
-    sp['pct_monthly_sp_change'] = 0.
-    sp['pct_bimonthly_sp_change'] = 0.
+# returns the date and price text of every row in the multpl.com datatable, skipping the first two rows
+# uses lxml when it is installed and falls back to BeautifulSoup's html.parser
+def parse_sp_page(page_content):
+    if lxml_html is not None:
+        rows = lxml_html.fromstring(page_content).xpath('//*[@id="datatable"]//tr')[2:]
+        cells = [row.xpath('./td') for row in rows]
+        return [c[0].text_content() for c in cells], [c[1].text_content() for c in cells]
+    rows = BeautifulSoup(page_content, 'html.parser').find(id='datatable').find_all('tr')[2:]
+    cells = [row.find_all('td') for row in rows]
+    return [c[0].text for c in cells], [c[1].text for c in cells]
+
+
+def get_sp_table(page_content=None):
+    if page_content is None:
+        page_content = fetch_sp(fetch_timeouts['SP'])
+    dates, prices = parse_sp_page(page_content)
+    sp = pd.DataFrame({'date': pd.to_datetime(dates, format='%b %d, %Y').strftime('%Y-%m-%d'),
+                       'average_sp_price': pd.Series(prices).str.replace(',', '').str.strip().astype(float)})
     sp = sp[sp['date'] >= '1967-01-01']
     sp = sp.sort_values('date').reset_index(drop=True)
-    for i in range(2, len(sp)):
-        monthly_pct_change = ((sp.at[i, 'average_sp_price'] -
-                               sp.at[i - 1, 'average_sp_price']) /
-                              sp.at[i - 1, 'average_sp_price']) * 100
-        sp.at[i, 'pct_monthly_sp_change'] = monthly_pct_change
-
-        bi_pct_change = ((sp.at[i, 'average_sp_price'] -
-                          sp.at[i - 2, 'average_sp_price']) /
-                         sp.at[i - 2, 'average_sp_price']) * 100
-        sp.at[i, 'pct_bimonthly_sp_change'] = bi_pct_change
+    sp['pct_monthly_sp_change'] = transforms.lag_pct_change(sp['average_sp_price'], 1)
+    sp['pct_bimonthly_sp_change'] = transforms.lag_pct_change(sp['average_sp_price'], 2)
 
     sp = sp[sp['date'] >= '1968-01-01'].reset_index(drop=True)
     print('S&P Table Most Recent: ', sp.iloc[-1]['date'])
     return sp
 
 
-def get_yield_table():
-    yield_ten = fred.get_series('DGS10')
-    yield_ten = pd.DataFrame(yield_ten).reset_index()
-    yield_ten.columns = ['date', 'ten_yr_yield']
-    yield_ten.date = [pd.to_datetime(x).strftime('%Y-%m-%d') for x in yield_ten.date.values]
-    yield_ten = yield_ten.merge(get_using_dates(), how='outer', on='date').sort_values('date')
-    yield_ten.ten_yr_yield = yield_ten.ten_yr_yield.fillna(method='bfill').fillna(method='ffill')
-    rows = [(x, y) for x, y
-            in zip(yield_ten.date.values, yield_ten.ten_yr_yield.values) if
-            (x.split('-')[2] == '01')]
-    yield_ten = pd.DataFrame(data=rows, columns=['date', 'ten_yr_yield'])
-
-    # 1 Year Yield
-    yield_one = fred.get_series('DGS1')
-    yield_one = pd.DataFrame(yield_one).reset_index()
-    yield_one.columns = ['date', 'one_yr_yield']
-    yield_one.date = [pd.to_datetime(x).strftime('%Y-%m-%d') for x in yield_one.date.values]
-    yield_one = yield_one.merge(get_using_dates(), how='outer', on='date').sort_values('date')
-    yield_one.one_yr_yield = yield_one.one_yr_yield.fillna(method='bfill').fillna(method='ffill')
-    rows = [(x, y) for x, y
-            in zip(yield_one.date.values, yield_one.one_yr_yield.values) if
-            (x.split('-')[2] == '01')]
-    yield_one = pd.DataFrame(data=rows, columns=['date', 'one_yr_yield'])
-
-    total_yield = yield_ten.merge(yield_one, how='inner', on='date')
+# how: the resample_monthly rule used to turn the daily yields into monthly values
+def get_yield_table(yield_ten=None, yield_one=None, how='first'):
+    if yield_ten is None:
+        yield_ten = fetch_fred('DGS10')
+    if yield_one is None:
+        yield_one = fetch_fred('DGS1')
+
+    dates = get_using_dates()['date']
+    months = pd.DatetimeIndex(dates)
+    total_yield = pd.DataFrame({'date': dates,
+                                'ten_yr_yield': transforms.resample_monthly(yield_ten, months, how).values,
+                                'one_yr_yield': transforms.resample_monthly(yield_one, months, how).values})
     total_yield['yield_diff'] = total_yield['ten_yr_yield'] - total_yield['one_yr_yield']
     total_yield['yield_below_zero'] = (total_yield['yield_diff'] < 0).astype(int)
     print('Yield Table Most Recent: ', total_yield.iloc[-1]['date'])
     return total_yield
 
 
-# returns the number of years from the given date since the last recession
-# returns 0 if date is during a recession
-# returns NaN if given date is before the earliest recorded recesssion in the data
-def yearsSinceRecession(date):
-    if date < recession_starts[0]:
-        return float('NaN')
-    days_since_list = []
-    for i in range(len(recession_ends)):
-        days_since = (datetime.datetime.strptime(date, '%Y-%m-%d') -
-                      datetime.datetime.strptime(recession_ends[i], '%Y-%m-%d')).days
-        days_since_list.append(days_since)
-    min_days = min(d for d in days_since_list if d > 0)
-    min_days_idx = days_since_list.index(min_days)
-    if min_days_idx == len(recession_starts) - 1:
-        return min_days / 365
-    elif date >= recession_starts[min_days_idx + 1]:
-        return 0
-    else:
-        return min_days / 365
-
-
-# returns the number of years from the given date until the next recession
-# returns 0 if date is in a recession
-# returns nan if date is after the latest recession
-def yearsUntilRecession(date):
-    days_until_list = []
-    for i in range(len(recession_starts)):
-        days_until = (datetime.datetime.strptime(recession_starts[i], '%Y-%m-%d') -
-                      datetime.datetime.strptime(date, '%Y-%m-%d')).days
-        days_until_list.append(days_until)
-    try:
-        min_days = min(d for d in days_until_list if d >= 0)
-    except ValueError:
-        if date <= recession_ends[-1]:
-            return 0
-        return float('NaN')
-    min_days_idx = days_until_list.index(min_days)
-    if (min_days_idx != 0) & (date <= recession_ends[min_days_idx - 1]):
-        return 0
-    else:
-        return min_days / 365
-
-
-# returns 1 if there is a recession in the next year, or if there is currently a recession
-# returns NaN if one year from the listed date is in the future
-# returns 0 otherwise
-def recessionInNextYear(date):
-    if yearsSinceRecession(date) == 0:
-        return 1
-
-    split_date = date.split('-')
-    one_year_later = str(int(split_date[0]) + 1) + '-' + split_date[1] + '-' + split_date[2]
-    if one_year_later > datetime.datetime.today().strftime('%Y-%m-%d'):
-        return float('NaN')
-    possible_matches = [d for d in recession_starts if d >= date]
-    possible_matches = [d for d in possible_matches if d <= one_year_later]
-    return float(len(possible_matches) > 0)
-
-
-def inRecession(date):
-    for i in range(len(recession_starts)):
-        if (date <= recession_ends[i]) & (date >= recession_starts[i]):
-            return 1
-    return 0
-
-
-def get_total_table():
-    YSRVect = np.vectorize(yearsSinceRecession)
-    YURVect = np.vectorize(yearsUntilRecession)
-    RINYVect = np.vectorize(recessionInNextYear)
-    IRVect = np.vectorize(inRecession)
-
-    total_data = get_unemp_table().merge(get_mhp_table(), how='inner', on='date')
-    total_data = total_data.merge(get_cpi_table(), how='inner', on='date')
-    total_data = total_data.merge(get_sp_table(), how='left', on='date')
-    total_data = total_data.merge(get_yield_table(), how='inner', on='date')
-
-    total_data['years_since_recession'] = YSRVect(total_data.date.values)
-    total_data['years_until_recession'] = YURVect(total_data.date.values)
-    total_data['recession_in_next_year'] = RINYVect(total_data.date.values)
-    total_data['in_recession'] = IRVect(total_data.date.values)
+# builds each source table from the raw responses returned by fetch_all
+def build_tables(raw):
+    return {'unemp': get_unemp_table(raw['UNRATE']),
+            'mhp': get_mhp_table(raw['MSPUS']),
+            'cpi': get_cpi_table(raw['CPI']),
+            'sp': get_sp_table(raw['SP']),
+            'yield': get_yield_table(raw['DGS10'], raw['DGS1'])}
+
+
+# merges the source tables into the feature columns of the total table, before any labels are added
+def merge_tables(tables):
+    total_data = tables['unemp'].merge(tables['mhp'], how='inner', on='date')
+    total_data = total_data.merge(tables['cpi'], how='inner', on='date')
+    total_data = total_data.merge(tables['sp'], how='left', on='date')
+    total_data = total_data.merge(tables['yield'], how='inner', on='date')
+    return total_data
+
+
+def build_feature_table(raw):
+    return merge_tables(build_tables(raw))
+
+
+# adds the recession label columns, which depend only on the date
+def add_labels(total_data):
+    labels = recession_calendar.get_labels(total_data.date.values)
+    for column in label_columns:
+        total_data[column] = labels[column].values
     return total_data
 
 
+# sources: optional override of get_sources(), e.g. stubs or recorded responses
+def get_total_table(sources=None):
+    return add_labels(build_feature_table(fetch_all(sources)))
+
+
+def shift_months(date, months):
+    return (pd.Timestamp(date) + pd.DateOffset(months=months)).strftime('%Y-%m-%d')
+
+
+# drops raw observations before start_date so only the recent window of each table is rebuilt
+# the S&P page cannot be cut down before parsing and is passed through whole
+def trim_sources(raw, start_date):
+    trimmed = dict(raw)
+    for name in ['UNRATE', 'MSPUS', 'DGS10', 'DGS1']:
+        trimmed[name] = raw[name][raw[name].index >= start_date]
+    cpi_lines = raw['CPI'].splitlines()
+    trimmed['CPI'] = '\n'.join([cpi_lines[0]] + [line for line in cpi_lines[1:] if line[:10] >= start_date])
+    return trimmed
+
+
+# updates an existing total table with new and revised months instead of rebuilding it
+# months from revision_window months before the last stored date onward are rebuilt and compared
+# returns the updated table, the dates that were added and the dates whose values were revised
+def update_total_table(total_data, sources=None, revision_window=24):
+    check_start = shift_months(total_data['date'].max(), -revision_window)
+    raw = trim_sources(fetch_all(sources), shift_months(check_start, -max_lookback))
+    window = build_feature_table(raw)
+    window = window[window['date'] >= check_start].set_index('date')
+
+    updated = total_data.set_index('date')
+    feature_columns = list(window.columns)
+    overlap = window.index.intersection(updated.index)
+    same = np.isclose(window.loc[overlap, feature_columns].values.astype(float),
+                      updated.loc[overlap, feature_columns].values.astype(float), equal_nan=True)
+    revised = overlap[~same.all(axis=1)]
+    added = window.index.difference(updated.index)
+
+    updated.loc[revised, feature_columns] = window.loc[revised, feature_columns]
+    updated = pd.concat([updated, window.loc[added]]).sort_index()
+
+    # labels only need computing for new months and months that could not be labeled last time
+    relabel = added.union(updated.index[updated['recession_in_next_year'].isnull()])
+    labels = add_labels(pd.DataFrame({'date': relabel})).set_index('date')
+    updated.loc[relabel, label_columns] = labels[label_columns]
+
+    updated = updated.reset_index().astype(total_data.dtypes.to_dict())
+    return updated, list(added), list(revised)
+
+
 if __name__ == "__main__":
-    total_data = get_total_table()
-    total_data.to_csv('mysite/CodeBase/Data/total_data.csv')
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--incremental', action='store_true',
+                        help='update the existing total_data.csv with new and revised months only')
+    parser.add_argument('--record', metavar='DIR', help='save every raw source response to DIR')
+    parser.add_argument('--replay', metavar='DIR', help='serve the source responses recorded in DIR')
+    parser.add_argument('--replay-latency', type=float, default=0.,
+                        help='seconds each replayed source waits before responding')
+    parser.add_argument('--write-predictions', action='store_true',
+                        help="score the updated table with the model registry's current versions for the dashboard")
+    args = parser.parse_args()
+
+    sources = None
+    if args.replay:
+        sources = SourceArchive(args.replay).replay(args.replay_latency)
+    elif args.record:
+        sources = SourceArchive(args.record).record(get_sources())
+
+    if args.incremental and os.path.exists(total_data_path):
+        existing = pd.read_csv(total_data_path, index_col=0)
+        total_data, added, revised = update_total_table(existing, sources)
+        print('Added Months: ', added)
+        print('Revised Months: ', revised)
+        if len(revised) == 0 and len(total_data) == len(existing) + len(added) and \
+                total_data.iloc[:len(existing)].equals(existing):
+            # nothing stored changed, so the new months can be appended to the file
+            storage.append_total_data(total_data, len(existing), total_data_path)
+        else:
+            storage.save_total_data(total_data, total_data_path)
+    else:
+        total_data = get_total_table(sources)
+        storage.save_total_data(total_data, total_data_path)
+
+    if args.write_predictions:
+        from CodeBase.Model.model_registry import ModelRegistry, HotSwapPredictor
+        from CodeBase.Model.predictions import write_predictions
+        # the versions the dashboard serves: the registry's current ones, or the saved models until one is promoted
+        registry = ModelRegistry()
+        saved_models_dir = 'mysite/CodeBase/Model/saved_models/AutogluonModels/'
+        write_predictions(total_data, total_data_path,
+                          HotSwapPredictor(registry, 'riny', fallback_path=saved_models_dir + 'riny_model/'),
+                          HotSwapPredictor(registry, 'yur', fallback_path=saved_models_dir + 'yur_model/'))
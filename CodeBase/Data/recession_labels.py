@@ -0,0 +1,72 @@
+# This file contains a vectorized engine for the recession label columns of the total table
+# It labels every date at once with binary searches over the recession boundaries instead of comparing each date
+# with every recession
+import datetime
+
+import numpy as np
+import pandas as pd
+
+
+class RecessionCalendar:
+
+    # starts and ends are 'YYYY-MM-DD' strings of each recession's first and last month, in any order
+    def __init__(self, starts, ends):
+        self.starts = np.array(starts, dtype='datetime64[D]')
+        self.ends = np.array(ends, dtype='datetime64[D]')
+        order = np.argsort(self.starts)
+        self.starts = self.starts[order]
+        self.ends = self.ends[order]
+
+    # returns the number of years since the end of the last recession, 0 during a recession
+    # and NaN before the first recession has ended
+    def years_since_recession(self, dates):
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        last_end = np.searchsorted(self.ends, dates, side='left') - 1
+        has_end = (last_end >= 0) & (dates >= self.starts[0])
+        last_end = np.clip(last_end, 0, len(self.ends) - 1)
+        days = (dates - self.ends[last_end]).astype(float)
+
+        next_start = np.minimum(last_end + 1, len(self.starts) - 1)
+        in_next = (last_end + 1 < len(self.starts)) & (dates >= self.starts[next_start])
+        return np.where(~has_end, np.nan, np.where(in_next, 0., days / 365))
+
+    # returns the number of years until the start of the next recession, 0 during a recession
+    # and NaN after the last recession
+    def years_until_recession(self, dates):
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        next_start = np.searchsorted(self.starts, dates, side='left')
+        has_start = next_start < len(self.starts)
+        days = (self.starts[np.minimum(next_start, len(self.starts) - 1)] - dates).astype(float)
+
+        prev_end = self.ends[np.maximum(next_start - 1, 0)]
+        in_prev = (next_start > 0) & (dates <= prev_end)
+        return np.where(in_prev, 0., np.where(has_start, days / 365, np.nan))
+
+    # returns 1 during a recession or if one starts within a year, NaN if a year from the date
+    # is after today and 0 otherwise
+    def recession_in_next_year(self, dates, today=None):
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        if today is None:
+            today = datetime.datetime.today()
+        today = np.datetime64(today.strftime('%Y-%m-%d'), 'D')
+        # Feb 29 rolls back to Feb 28, which compares the same as the invalid '<year>-02-29' string did
+        one_year_later = (pd.DatetimeIndex(dates) + pd.DateOffset(years=1)).values.astype('datetime64[D]')
+
+        starts_within = (np.searchsorted(self.starts, one_year_later, side='right') -
+                         np.searchsorted(self.starts, dates, side='left')) > 0
+        labels = np.where(one_year_later > today, np.nan, starts_within.astype(float))
+        return np.where(self.years_since_recession(dates) == 0, 1., labels)
+
+    # returns 1 if the date falls within a recession and 0 otherwise
+    def in_recession(self, dates):
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        last_start = np.searchsorted(self.starts, dates, side='right') - 1
+        return ((last_start >= 0) & (dates <= self.ends[np.maximum(last_start, 0)])).astype(int)
+
+    # returns all four label columns for the given dates in one frame
+    def get_labels(self, dates, today=None):
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        return pd.DataFrame({'years_since_recession': self.years_since_recession(dates),
+                             'years_until_recession': self.years_until_recession(dates),
+                             'recession_in_next_year': self.recession_in_next_year(dates, today),
+                             'in_recession': self.in_recession(dates)})
@@ -0,0 +1,72 @@
+# This file contains a record/replay archive for the upstream data sources of get_data.py
+# A record run saves every raw response (FRED series, the fredgraph CPI csv, the multpl.com page) to a directory,
+# and a replay run serves them back from it, optionally after an artificial delay, without any network access
+import os
+import time
+
+import pandas as pd
+
+# the file ending each kind of raw response is stored under
+series_ext = '.series.csv'
+text_ext = '.txt'
+bytes_ext = '.bin'
+
+
+class SourceArchive:
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+
+    def get_path(self, name, ext):
+        return os.path.join(self.archive_dir, name + ext)
+
+    def save(self, name, payload):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        if isinstance(payload, pd.Series):
+            payload.rename('value').to_csv(self.get_path(name, series_ext), index_label='date')
+        elif isinstance(payload, str):
+            with open(self.get_path(name, text_ext), 'w', encoding='utf-8') as f:
+                f.write(payload)
+        else:
+            with open(self.get_path(name, bytes_ext), 'wb') as f:
+                f.write(payload)
+
+    def load(self, name):
+        if os.path.exists(self.get_path(name, series_ext)):
+            series = pd.read_csv(self.get_path(name, series_ext), index_col=0, parse_dates=True)
+            return series[series.columns[0]].rename(None)
+        if os.path.exists(self.get_path(name, text_ext)):
+            with open(self.get_path(name, text_ext), encoding='utf-8') as f:
+                return f.read()
+        if os.path.exists(self.get_path(name, bytes_ext)):
+            with open(self.get_path(name, bytes_ext), 'rb') as f:
+                return f.read()
+        raise ValueError('No recorded response for ' + name + ' in ' + self.archive_dir)
+
+    def names(self):
+        return sorted(set(f.split('.')[0] for f in os.listdir(self.archive_dir)))
+
+    # wraps each source so that its response is saved to the archive as it is fetched
+    def record(self, sources):
+        def recorder(name, fetch):
+            def fetch_and_save(timeout=None):
+                payload = fetch(timeout=timeout)
+                self.save(name, payload)
+                return payload
+            return fetch_and_save
+        return {name: recorder(name, fetch) for name, fetch in sources.items()}
+
+    # returns sources that serve the recorded responses, each after `latency` seconds
+    # latency is either one value for every source or a dict keyed by source name
+    def replay(self, latency=0., names=None):
+        if names is None:
+            names = self.names()
+
+        def replayer(name):
+            delay = latency.get(name, 0.) if isinstance(latency, dict) else latency
+
+            def fetch_recorded(timeout=None):
+                time.sleep(delay)
+                return self.load(name)
+            return fetch_recorded
+        return {name: replayer(name) for name in names}
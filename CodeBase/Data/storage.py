@@ -0,0 +1,67 @@
+# This file contains methods for saving and loading the assembled total table
+# The table is kept both as the original CSV and as a typed Parquet file next to it, which loads faster,
+# stores real datetime64 dates and 1 byte flags, and can read only the requested columns
+import os
+
+import numpy as np
+import pandas as pd
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+flag_columns = ['yield_below_zero', 'in_recession']
+# 0/1 label that is NaN for the most recent year
+nullable_flag_columns = ['recession_in_next_year']
+
+
+def get_parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+# converts the table to the stored dtypes: datetime64 dates, int8 flags and float32 for the nullable flag
+def to_compact_types(total_data):
+    total_data = total_data.copy()
+    if 'date' in total_data.columns:
+        total_data['date'] = pd.to_datetime(total_data['date'])
+    for column in flag_columns:
+        if column in total_data.columns:
+            total_data[column] = total_data[column].astype(np.int8)
+    for column in nullable_flag_columns:
+        if column in total_data.columns:
+            total_data[column] = total_data[column].astype(np.float32)
+    return total_data
+
+
+# writes the table as CSV and, when pyarrow is installed, as Parquet
+def save_total_data(total_data, csv_path):
+    total_data.to_csv(csv_path)
+    if pyarrow is not None:
+        to_compact_types(total_data).to_parquet(get_parquet_path(csv_path), index=False)
+
+
+# appends the rows after the first n_existing to the CSV instead of rewriting it
+# the Parquet copy cannot be appended to and is rewritten from the full table
+def append_total_data(total_data, n_existing, csv_path):
+    total_data.iloc[n_existing:].to_csv(csv_path, mode='a', header=False)
+    if pyarrow is not None:
+        to_compact_types(total_data).to_parquet(get_parquet_path(csv_path), index=False)
+
+
+# loads the table, reading the Parquet copy when it is at least as new as the CSV
+# columns: only load these columns
+# date_format: format the dates as strings the way the CSV stores them, None keeps datetime64
+def load_total_data(csv_path, columns=None, date_format='%Y-%m-%d'):
+    parquet_path = get_parquet_path(csv_path)
+    if pyarrow is not None and os.path.exists(parquet_path) and \
+            os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        total_data = pd.read_parquet(parquet_path, columns=columns)
+    else:
+        if columns is None:
+            total_data = pd.read_csv(csv_path, index_col=0)
+        else:
+            total_data = pd.read_csv(csv_path, usecols=columns)[list(columns)]
+        total_data = to_compact_types(total_data)
+    if date_format is not None and 'date' in total_data.columns:
+        total_data['date'] = total_data['date'].dt.strftime(date_format)
+    return total_data
@@ -0,0 +1,46 @@
+# This file contains the vectorized feature transforms shared by the get_data table builders
+import numpy as np
+import pandas as pd
+
+
+# returns the difference between each value and the value `periods` rows earlier
+# the first `periods` rows have no lookback and are set to 0
+def lag_diff(series, periods):
+    values = series.to_numpy(dtype=float)
+    out = np.zeros(len(values))
+    if len(values) > periods:
+        out[periods:] = values[periods:] - values[:-periods]
+    return pd.Series(out, index=series.index, name=series.name)
+
+
+# returns the percent change (0-100 scale) between each value and the value `periods` rows earlier
+# the first `periods` rows have no lookback and are set to 0
+def lag_pct_change(series, periods):
+    values = series.to_numpy(dtype=float)
+    out = np.zeros(len(values))
+    if len(values) > periods:
+        out[periods:] = ((values[periods:] - values[:-periods]) / values[:-periods]) * 100
+    return pd.Series(out, index=series.index, name=series.name)
+
+
+# returns the change in the `periods` percent change over another `periods` rows
+# Ex. the change in the yearly housing price climb from one year to the next
+def second_order_change(series, periods):
+    return lag_diff(lag_pct_change(series, periods), periods)
+
+
+# returns a rolling window statistic (mean, sum, min, max, std) over the last `window` rows
+# rows without a full window are NaN
+def rolling_window(series, window, how='mean'):
+    return getattr(series.astype(float).rolling(window), how)()
+
+
+# turns a datetime-indexed daily series into one value for each month start in `months`
+# how picks the value within each month: 'first' (first business day with data), 'mean' or 'last' (month end)
+# months without observations take the next month's value and months after the series ends take its last value
+def resample_monthly(series, months, how='first'):
+    series = series.dropna().sort_index()
+    monthly = getattr(series.resample('MS'), how)()
+    monthly = monthly.reindex(monthly.index.union(months)).fillna(method='bfill')
+    monthly[monthly.index > series.index[-1]] = series.iloc[-1]
+    return monthly.reindex(months)
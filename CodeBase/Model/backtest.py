@@ -0,0 +1,204 @@
+# This file contains a walk-forward backtest of the RINY and YUR models
+# At each origin date a model is refit on only the rows whose labels were already known on that date and scores
+# the rows up to the next origin, so the scores show how the model would have done in real time
+# The origins run in parallel in a process pool, and the feature matrix is put in shared memory once
+# for all of them instead of being copied to every worker
+# Ex. python -m CodeBase.Model.backtest --task riny --model hgb --jobs 4 --scaling 1 2 4
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn import metrics
+from threadpoolctl import threadpool_limits
+from CodeBase.Data.storage import load_total_data
+from CodeBase.Model.model_inputs import feature_columns
+
+total_data_path = 'mysite/CodeBase/Data/total_data.csv'
+
+task_labels = {'riny': 'recession_in_next_year', 'yur': 'years_until_recession'}
+
+# the worker's view of the shared feature matrix: feature columns, then the label, then the date in days
+shared = {}
+
+
+# copies the matrix into a new shared memory block, which the caller must close and unlink
+def share_matrix(matrix):
+    block = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+    np.ndarray(matrix.shape, matrix.dtype, buffer=block.buf)[:] = matrix
+    return block
+
+
+# process pool initializer, attaches the worker to the shared matrix without copying it
+# and limits its math library threads to its share of the CPUs so the workers do not oversubscribe them
+def attach_matrix(name, shape, dtype, threads):
+    threadpool_limits(limits=threads)
+    shared['block'] = shared_memory.SharedMemory(name=name)
+    shared['matrix'] = np.ndarray(shape, dtype, buffer=shared['block'].buf)
+
+
+# the days from the start of a row to the day its label is known
+# RINY: one year later, YUR: the start of the next recession
+def get_label_delay(task, labels):
+    if task == 'riny':
+        return np.full(len(labels), 365.)
+    return labels * 365
+
+
+# fits a model on the training rows and returns its predictions for the test rows
+# riny predicts the probability of a recession within a year, yur the years until the next recession
+# model: 'hgb' for a scikit-learn gradient boosted tree model, fast enough for many origins,
+#        or 'autogluon' for a TabularPredictor fit the way train_models.py does, with fit_args passed to fit
+def fit_predict(task, model, X_train, y_train, X_test, fit_args=None):
+    fit_args = fit_args or {}
+    if model == 'autogluon':
+        from autogluon.tabular import TabularPredictor
+        label = task_labels[task]
+        train = pd.DataFrame(X_train, columns=feature_columns)
+        train[label] = y_train
+        test = pd.DataFrame(X_test, columns=feature_columns)
+        path = tempfile.mkdtemp(prefix='backtest_')
+        try:
+            predictor = TabularPredictor(label=label, path=path, verbosity=0).fit(train_data=train, **fit_args)
+            if task == 'riny':
+                return predictor.predict_proba(test)[1].values
+            return predictor.predict(test).values
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    if task == 'riny':
+        # the earliest origins can have seen only one outcome
+        if len(np.unique(y_train)) < 2:
+            return np.full(len(X_test), float(y_train[0]))
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(random_state=0, **fit_args).fit(X_train, y_train) \
+            .predict_proba(X_test)[:, 1]
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(random_state=0, **fit_args).fit(X_train, y_train).predict(X_test)
+
+
+# runs one origin in a worker: returns the test row numbers, their predictions and the training size and time
+def run_origin(task, model, origin, end, min_train_rows, fit_args):
+    matrix = shared['matrix']
+    n_features = len(feature_columns)
+    labels, days = matrix[:, n_features], matrix[:, n_features + 1]
+    known = ~np.isnan(labels) & (days + get_label_delay(task, labels) <= origin)
+    train_rows = np.flatnonzero(known)
+    test_rows = np.arange(np.searchsorted(days, origin), np.searchsorted(days, end))
+    if len(train_rows) < min_train_rows or len(test_rows) == 0:
+        return test_rows, None, len(train_rows), 0.
+    start = time.perf_counter()
+    preds = fit_predict(task, model, matrix[train_rows, :n_features], labels[train_rows],
+                        matrix[test_rows, :n_features], fit_args)
+    return test_rows, preds, len(train_rows), time.perf_counter() - start
+
+
+# returns the scores of the predictions of the rows whose labels are known
+def get_metrics(task, actual, preds):
+    scored = ~np.isnan(actual)
+    actual, preds = actual[scored], preds[scored]
+    if len(actual) == 0:
+        return {'scored_rows': 0}
+    if task == 'riny':
+        pred_class = (preds >= 0.5).astype(float)
+        return {'scored_rows': len(actual), 'accuracy': metrics.accuracy_score(actual, pred_class),
+                'f1': metrics.f1_score(actual, pred_class, zero_division=0),
+                'brier': metrics.brier_score_loss(actual, preds)}
+    return {'scored_rows': len(actual), 'mae': metrics.mean_absolute_error(actual, preds),
+            'rmse': float(np.sqrt(metrics.mean_squared_error(actual, preds)))}
+
+
+# returns the origin dates, every step_months months from start (default: 20 years into the data)
+def get_origins(total_data, start=None, step_months=12):
+    dates = pd.to_datetime(total_data['date'])
+    start = pd.Timestamp(start) if start is not None else dates.min() + pd.DateOffset(years=20)
+    return list(pd.date_range(start, dates.max(), freq=pd.DateOffset(months=step_months)))
+
+
+# runs the walk-forward backtest and returns the predictions (one row per origin and scored date)
+# and the metrics, training size and fit time of each origin
+# n_jobs: worker processes, None uses every CPU
+def run_backtest(total_data, task='riny', origins=None, step_months=12, model='hgb', n_jobs=None,
+                 min_train_rows=60, fit_args=None):
+    label = task_labels[task]
+    data = total_data[~total_data[feature_columns].isnull().any(axis=1)]
+    data = data.assign(date=pd.to_datetime(data['date'])).sort_values('date')
+    if origins is None:
+        origins = get_origins(data, step_months=step_months)
+    origins = list(pd.to_datetime(origins))
+    ends = origins[1:] + [origins[-1] + pd.DateOffset(months=step_months)]
+    days = data['date'].values.astype('datetime64[D]').astype(float)
+    matrix = np.column_stack([data[feature_columns].to_numpy(dtype=float),
+                              data[label].to_numpy(dtype=float), days])
+
+    n_jobs = n_jobs or os.cpu_count()
+    block = share_matrix(matrix)
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=attach_matrix,
+                                 initargs=(block.name, matrix.shape, matrix.dtype,
+                                           max(os.cpu_count() // n_jobs, 1))) as pool:
+            futures = [pool.submit(run_origin, task, model,
+                                   float(np.datetime64(origin, 'D').astype(float)),
+                                   float(np.datetime64(end, 'D').astype(float)), min_train_rows, fit_args)
+                       for origin, end in zip(origins, ends)]
+            results = [future.result() for future in futures]
+    finally:
+        block.close()
+        block.unlink()
+
+    preds, origin_metrics = [], []
+    for origin, (test_rows, origin_preds, n_train, fit_time) in zip(origins, results):
+        row = {'origin': origin, 'train_rows': n_train, 'test_rows': len(test_rows), 'fit_s': fit_time}
+        if origin_preds is not None:
+            actual = matrix[test_rows, len(feature_columns)]
+            preds.append(pd.DataFrame({'origin': origin, 'date': data['date'].values[test_rows],
+                                       'actual': actual, 'pred': origin_preds}))
+            row.update(get_metrics(task, actual, origin_preds))
+        origin_metrics.append(row)
+    preds = pd.concat(preds, ignore_index=True) if preds else \
+        pd.DataFrame(columns=['origin', 'date', 'actual', 'pred'])
+    return preds, pd.DataFrame(origin_metrics)
+
+
+# returns the backtest wall time and speedup over one worker for each number of workers
+def get_scaling(total_data, jobs, task='riny', **backtest_args):
+    timings = []
+    for n_jobs in jobs:
+        start = time.perf_counter()
+        run_backtest(total_data, task, n_jobs=n_jobs, **backtest_args)
+        timings.append({'jobs': n_jobs, 'wall_s': time.perf_counter() - start})
+    timings = pd.DataFrame(timings)
+    timings['speedup'] = timings['wall_s'].iloc[0] / timings['wall_s']
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of the RINY or YUR model')
+    parser.add_argument('--task', default='riny', choices=list(task_labels))
+    parser.add_argument('--model', default='hgb', choices=['hgb', 'autogluon'])
+    parser.add_argument('--start', default=None, help='first origin date (default: 20 years into the data)')
+    parser.add_argument('--step-months', type=int, default=12)
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: all CPUs)')
+    parser.add_argument('--scaling', type=int, nargs='+', default=None,
+                        help='also time the backtest with each of these numbers of workers')
+    parser.add_argument('--output', default='backtest', help='directory for the predictions and metrics CSVs')
+    args = parser.parse_args()
+
+    total_data = load_total_data(total_data_path)
+    origins = get_origins(total_data, args.start, args.step_months)
+    fit_args = {'presets': 'medium_quality'} if args.model == 'autogluon' else None
+    preds, origin_metrics = run_backtest(total_data, args.task, origins, args.step_months, args.model, args.jobs,
+                                         fit_args=fit_args)
+    os.makedirs(args.output, exist_ok=True)
+    preds.to_csv(os.path.join(args.output, args.task + '_backtest_preds.csv'), index=False)
+    origin_metrics.to_csv(os.path.join(args.output, args.task + '_backtest_metrics.csv'), index=False)
+    print(origin_metrics.to_string(index=False))
+    if args.scaling:
+        scaling = get_scaling(total_data, args.scaling, args.task, origins=origins, step_months=args.step_months,
+                              model=args.model, fit_args=fit_args)
+        scaling.to_csv(os.path.join(args.output, args.task + '_backtest_scaling.csv'), index=False)
+        print(scaling.to_string(index=False))
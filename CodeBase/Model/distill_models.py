@@ -0,0 +1,100 @@
+# This file distills the saved RINY and YUR ensembles into compact student models for serving
+# and writes a report of their fidelity to the ensembles, prediction latency and memory use
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from autogluon.tabular import TabularPredictor
+from CodeBase.Data.storage import load_total_data
+from CodeBase.Model.model_inputs import feature_columns
+from CodeBase.Model.distilled_model import DistilledModel, make_feature_samples, get_teacher_preds, get_fidelity
+
+total_data_path = 'mysite/CodeBase/Data/total_data.csv'
+models_dir = 'mysite/CodeBase/Model/saved_models/AutogluonModels/'
+distilled_dir = 'mysite/CodeBase/Model/saved_models/distilled/'
+
+# loads a model in a fresh process, makes one prediction and prints the load time and resident memory
+load_script = '''
+import json, sys, time
+import psutil
+import pandas as pd
+start = time.perf_counter()
+if sys.argv[1] == 'teacher':
+    from autogluon.tabular import TabularPredictor
+    model = TabularPredictor.load(sys.argv[2])
+else:
+    from CodeBase.Model.distilled_model import DistilledModel
+    model = DistilledModel.load(sys.argv[2])
+model.predict(pd.DataFrame([dict.fromkeys(json.loads(sys.argv[3]), 0.)]))
+print(json.dumps({'load_s': time.perf_counter() - start, 'rss_mb': psutil.Process().memory_info().rss / 2 ** 20}))
+'''
+
+
+def get_dir_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def get_load_cost(kind, path):
+    output = subprocess.run([sys.executable, '-c', load_script, kind, path, json.dumps(feature_columns)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# average seconds per call for one-row predictions and per row for a batch of batch_size rows
+def get_latency(predict, samples, single_calls=50, batch_size=1000):
+    start = time.perf_counter()
+    for i in range(single_calls):
+        predict(samples.iloc[[i]])
+    single = (time.perf_counter() - start) / single_calls
+    start = time.perf_counter()
+    predict(samples.iloc[:batch_size])
+    return {'single_row_s': single, 'batch_per_row_s': (time.perf_counter() - start) / batch_size}
+
+
+def distill_model(task, predictor, samples, n_historical, holdout=0.2, seed=0):
+    teacher_preds = get_teacher_preds(predictor, samples, task)
+    rng = np.random.default_rng(seed)
+    is_holdout = rng.random(len(samples)) < holdout
+    student = DistilledModel(task).fit(samples[~is_holdout], teacher_preds[~is_holdout], seed=seed)
+
+    student_preds = student.predict(samples)
+    # the historical rows the student was not trained on, so fidelity is never measured on training rows
+    is_historical_holdout = (np.arange(len(samples)) < n_historical) & is_holdout
+    if task == 'riny':
+        teacher_predict = lambda df: predictor.predict_proba(df)
+    else:
+        teacher_predict = predictor.predict
+    report = {'fidelity_holdout': get_fidelity(student_preds[is_holdout], teacher_preds[is_holdout], task),
+              'fidelity_historical_holdout': get_fidelity(student_preds[is_historical_holdout],
+                                                          teacher_preds[is_historical_holdout], task),
+              'latency_teacher': get_latency(teacher_predict, samples),
+              'latency_student': get_latency(student.predict, samples)}
+    return student, report
+
+
+if __name__ == "__main__":
+    total_data = load_total_data(total_data_path)
+    samples = make_feature_samples(total_data)
+    n_historical = len(total_data[feature_columns].dropna())
+    os.makedirs(distilled_dir, exist_ok=True)
+
+    reports = {}
+    for task in ['riny', 'yur']:
+        teacher_path = models_dir + task + '_model/'
+        student_path = distilled_dir + task + '_student.joblib'
+        student, report = distill_model(task, TabularPredictor.load(teacher_path), samples, n_historical)
+        student.save(student_path)
+        report['size_mb_teacher'] = get_dir_size(teacher_path) / 2 ** 20
+        report['size_mb_student'] = get_dir_size(student_path) / 2 ** 20
+        report['load_teacher'] = get_load_cost('teacher', teacher_path)
+        report['load_student'] = get_load_cost('student', student_path)
+        reports[task] = report
+        print(task.upper(), json.dumps(report, indent=2))
+
+    with open(distilled_dir + 'distill_report.json', 'w') as f:
+        json.dump(reports, f, indent=2)
@@ -0,0 +1,79 @@
+# This file contains a compact student model distilled from a saved AutoGluon ensemble
+# The student is a single scikit-learn gradient boosted tree model trained on the ensemble's own predictions,
+# saved with joblib, so serving it needs neither AutoGluon nor the bagged model directories
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.ensemble import HistGradientBoostingRegressor
+from CodeBase.Model.model_inputs import feature_columns, get_pred_frame
+
+
+# returns the historical feature rows plus n_synthetic rows drawn uniformly over each feature's range,
+# widened by `margin` of the range on both sides, so the student also sees scenarios the calculator allows
+def make_feature_samples(total_data, n_synthetic=20000, margin=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    historical = total_data[feature_columns].dropna()
+    synthetic = {}
+    for column in ['housing_climb_change', '36_mo_cpi_change_all', 'yield_diff', 'years_since_recession',
+                   'un_rate']:
+        low, high = historical[column].min(), historical[column].max()
+        synthetic[column] = rng.uniform(low - margin * (high - low), high + margin * (high - low), n_synthetic)
+    synthetic['years_since_recession'] = np.maximum(synthetic['years_since_recession'], 0)
+    synthetic['un_rate'] = np.maximum(synthetic['un_rate'], 0)
+    synthetic = get_pred_frame(synthetic['housing_climb_change'], synthetic['36_mo_cpi_change_all'],
+                               synthetic['yield_diff'], synthetic['years_since_recession'], synthetic['un_rate'])
+    return pd.concat([historical, synthetic], ignore_index=True)
+
+
+# returns what the teacher predicts for the samples, the class 1 probability for the RINY classifier
+def get_teacher_preds(predictor, samples, task):
+    if task == 'riny':
+        return predictor.predict_proba(samples)[1].values
+    return predictor.predict(samples).values
+
+
+class DistilledModel:
+
+    # task: 'riny' (recession probability, clipped to [0, 1]) or 'yur' (years until recession)
+    def __init__(self, task, student=None):
+        self.task = task
+        self.student = student
+
+    def fit(self, samples, teacher_preds, max_iter=500, learning_rate=0.05, seed=0):
+        self.student = HistGradientBoostingRegressor(max_iter=max_iter, learning_rate=learning_rate,
+                                                     random_state=seed)
+        self.student.fit(samples[feature_columns].values, teacher_preds)
+        return self
+
+    def predict(self, pred_df):
+        preds = self.student.predict(pred_df[feature_columns].values.astype(float))
+        if self.task == 'riny':
+            preds = np.clip(preds, 0, 1)
+        return preds
+
+    # same arguments and rounding as RINYModel.make_pred / YURModel.make_pred
+    def make_pred(self, house=0, cpi=0, yd=0, ysr=0, un=0):
+        return round(self.predict(get_pred_frame(house, cpi, yd, ysr, un))[0], 3)
+
+    def make_pred_batch(self, house=0, cpi=0, yd=0, ysr=0, un=0):
+        return np.round(self.predict(get_pred_frame(house, cpi, yd, ysr, un)), 3)
+
+    def save(self, path):
+        joblib.dump({'task': self.task, 'student': self.student}, path, compress=3)
+
+    @staticmethod
+    def load(path):
+        saved = joblib.load(path)
+        return DistilledModel(saved['task'], saved['student'])
+
+
+# returns how closely the student follows the teacher on the given predictions
+def get_fidelity(student_preds, teacher_preds, task):
+    errors = np.abs(student_preds - teacher_preds)
+    fidelity = {'mae': float(errors.mean()),
+                'max_abs_error': float(errors.max()),
+                'r2': float(1 - ((student_preds - teacher_preds) ** 2).sum() /
+                            ((teacher_preds - teacher_preds.mean()) ** 2).sum())}
+    if task == 'riny':
+        fidelity['class_agreement'] = float(((student_preds >= 0.5) == (teacher_preds >= 0.5)).mean())
+    return fidelity
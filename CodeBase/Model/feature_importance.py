@@ -0,0 +1,134 @@
+# This file contains a cached, parallel permutation feature importance for the saved TabularPredictors
+# It gives the same measure as predictor.feature_importance: how much the predictor's score drops when a feature's
+# values are shuffled, but the shuffles run in a process pool, on a subsample of the rows, and stop for each feature
+# as soon as its confidence interval is narrow enough
+# Results are saved keyed by the model version, the data and the settings, so asking again costs nothing
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from CodeBase.Model.lazy_predictor import get_model_version
+
+default_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_models', 'importance_cache')
+
+# the worker's predictor and data, set once per worker process by init_worker
+worker = {}
+
+
+def load_predictor(path):
+    from autogluon.tabular import TabularPredictor
+    return TabularPredictor.load(path)
+
+
+def get_data_hash(data):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    digest.update(json.dumps(list(map(str, data.columns))).encode())
+    return digest.hexdigest()[:16]
+
+
+# the predictor's evaluation metric on the data, higher is better
+def get_score(predictor, data):
+    return predictor.evaluate(data, silent=True)[predictor.eval_metric.name]
+
+
+def init_worker(predictor_path, data, loader=load_predictor):
+    worker['predictor'] = loader(predictor_path)
+    worker['data'] = data
+
+
+# returns the score of the data with the feature shuffled once for each shuffle number
+# each shuffle is seeded by (seed, feature number, shuffle number), so results do not depend on the worker
+def get_shuffled_scores(feature, feature_number, shuffles, seed, predictor=None, data=None):
+    predictor = predictor if predictor is not None else worker['predictor']
+    data = data if data is not None else worker['data']
+    scores = []
+    for shuffle in shuffles:
+        rng = np.random.default_rng([seed, feature_number, shuffle])
+        scores.append(get_score(predictor, data.assign(**{feature: rng.permutation(data[feature].values)})))
+    return feature, scores
+
+
+# summarizes the score drops of each feature like predictor.feature_importance does
+def summarize(drops, confidence):
+    rows = {}
+    for feature, values in drops.items():
+        values = np.array(values)
+        n = len(values)
+        stddev = values.std(ddof=1) if n > 1 else np.nan
+        half_width = stats.t.ppf((1 + confidence) / 2, n - 1) * stddev / np.sqrt(n) if n > 1 else np.nan
+        p_value = stats.t.sf(values.mean() / (stddev / np.sqrt(n)), n - 1) if n > 1 and stddev > 0 else np.nan
+        rows[feature] = {'importance': values.mean(), 'stddev': stddev, 'p_value': p_value, 'n': n,
+                         'p{}_high'.format(int(confidence * 100)): values.mean() + half_width,
+                         'p{}_low'.format(int(confidence * 100)): values.mean() - half_width}
+    return pd.DataFrame(rows).T.sort_values('importance', ascending=False)
+
+
+# computes the permutation importance of each feature
+# predictor: a saved predictor's path, or a loaded predictor (its path is used by the worker processes)
+# data: rows with the label column, of which subsample are drawn (None uses them all)
+# shuffles run in rounds of min_shuffles per feature; a feature stops once the confidence interval of its
+# importance is no wider than ci_tolerance either side of the mean, or after max_shuffles
+# n_jobs: worker processes, 1 runs in this process
+# loader: loads the predictor from its path, in each worker and here when predictor is a path
+def compute_importance(predictor, data, features=None, subsample=5000, min_shuffles=3, max_shuffles=10,
+                       ci_tolerance=0.005, confidence=0.99, n_jobs=None, seed=0, loader=load_predictor):
+    predictor_path = predictor if isinstance(predictor, str) else predictor.path
+    if isinstance(predictor, str):
+        predictor = loader(predictor)
+    if subsample is not None and len(data) > subsample:
+        data = data.sample(subsample, random_state=seed)
+    features = features or [column for column in data.columns if column != predictor.label]
+    base_score = get_score(predictor, data)
+
+    drops = {feature: [] for feature in features}
+    pool = None
+    if n_jobs != 1:
+        # spawned rather than forked: this process has already run the models' OpenMP thread pools
+        # (LightGBM, CatBoost, XGBoost), which can deadlock in a forked child
+        pool = ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context('spawn'), initializer=init_worker,
+                                   initargs=(predictor_path, data, loader))
+    try:
+        active = list(features)
+        while active:
+            jobs = [(feature, features.index(feature),
+                     range(len(drops[feature]), min(len(drops[feature]) + min_shuffles, max_shuffles)))
+                    for feature in active]
+            if pool is None:
+                results = [get_shuffled_scores(*job, seed, predictor, data) for job in jobs]
+            else:
+                results = [future.result() for future in [pool.submit(get_shuffled_scores, *job, seed)
+                                                           for job in jobs]]
+            for feature, scores in results:
+                drops[feature] += [base_score - score for score in scores]
+            summary = summarize({feature: drops[feature] for feature in active}, confidence)
+            half_width = summary['p{}_high'.format(int(confidence * 100))] - summary['importance']
+            # a feature with a single shuffle has no interval yet (NaN) and stays active
+            active = [feature for feature in active if len(drops[feature]) < max_shuffles and
+                      not half_width[feature] <= ci_tolerance]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return summarize(drops, confidence)
+
+
+# returns the permutation importance from the cache, computing and saving it on a miss
+# takes the same arguments as compute_importance, and any of them changing is a different cache entry
+def get_feature_importance(predictor, data, cache_dir=default_cache_dir, **importance_args):
+    predictor_path = predictor if isinstance(predictor, str) else predictor.path
+    settings = {'model_version': get_model_version(predictor_path), 'data': get_data_hash(data),
+                'args': {name: importance_args[name] for name in sorted(importance_args)
+                         if name not in ['n_jobs', 'loader']}}
+    key = hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, os.path.basename(os.path.normpath(predictor_path)) + '_' + key + '.csv')
+    if os.path.exists(path):
+        return pd.read_csv(path, index_col=0)
+    importance = compute_importance(predictor, data, **importance_args)
+    os.makedirs(cache_dir, exist_ok=True)
+    importance.to_csv(path)
+    return importance
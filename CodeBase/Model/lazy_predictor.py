@@ -0,0 +1,43 @@
+# This file contains a stand-in for a saved TabularPredictor that only loads it when it is first used,
+# so importing the dashboard does not pay for importing AutoGluon and loading every bagged model
+import hashlib
+import os
+import threading
+
+# the files that change whenever the predictor is retrained
+model_version_files = ['predictor.pkl', 'learner.pkl', os.path.join('models', 'trainer.pkl')]
+
+
+# a hash of the saved predictor's metadata files, which changes with every retrain
+def get_model_version(predictor_path):
+    digest = hashlib.sha1()
+    for name in model_version_files:
+        path = os.path.join(predictor_path, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class LazyPredictor:
+
+    def __init__(self, path):
+        self.path = path
+        self.predictor = None
+        self.lock = threading.Lock()
+
+    def is_loaded(self):
+        return self.predictor is not None
+
+    def load(self):
+        with self.lock:
+            if self.predictor is None:
+                from autogluon.tabular import TabularPredictor
+                self.predictor = TabularPredictor.load(self.path)
+        return self.predictor
+
+    # any predictor attribute (predict, predict_proba, evaluate, ...) loads the predictor first
+    def __getattr__(self, name):
+        if name in ['path', 'predictor', 'lock']:
+            raise AttributeError(name)
+        return getattr(self.load(), name)
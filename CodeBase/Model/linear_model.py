@@ -1,13 +1,21 @@
 # import machine learning packages
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from autogluon.tabular import TabularPredictor
+from CodeBase.Model.prediction_cache import PredictionCache
+from CodeBase.Model.lazy_predictor import LazyPredictor
+from CodeBase.Model.model_registry import get_served
+from CodeBase.Model.model_inputs import get_pred_frame
+from CodeBase.Model.predictions import PredictionFrame
 
 
 class YURModel:
 
-    def __init__(self, total_data, model=None):
+    # model: a fitted TabularPredictor, the path of a saved one to load on first use, or None to fit one
+    # cache_size/cache_ttl: bounds of the make_pred cache, see PredictionCache
+    def __init__(self, total_data, model=None, cache_size=1024, cache_ttl=None):
         self.total_data = total_data
+        self.pred_cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
         self.yur_columns = ['date', 'housing_climb_change', '36_mo_cpi_change_all', 'un_rate',
                             'yield_diff', 'yield_below_zero', 'years_since_recession', 'years_until_recession',
                             'recession_in_next_year']
@@ -17,20 +25,49 @@ class YURModel:
                                'yield_diff', 'yield_below_zero',
                                'years_since_recession']]
         self.y = self.yur_df[['years_until_recession']]
-        self.X_train, self.X_test, self.y_train, self.y_test = self.train_test()
+        # the train/test split is only made when something needs it, serving never does
+        self.split = None
         if model is None:
             self.linreg = self.fit_model()
+        elif isinstance(model, str):
+            self.linreg = LazyPredictor(model)
         else:
             self.linreg = model
+        # predictions for the whole table, made once; the dashboard replaces it with the frame it shares with RINY
+        self.pred_frame = PredictionFrame(self.total_data, yur_predictor=self.linreg)
+
+    @property
+    def X_train(self):
+        return self.get_split()[0]
+
+    @property
+    def X_test(self):
+        return self.get_split()[1]
+
+    @property
+    def y_train(self):
+        return self.get_split()[2]
+
+    @property
+    def y_test(self):
+        return self.get_split()[3]
+
+    def get_split(self):
+        if self.split is None:
+            self.split = self.train_test()
+        return self.split
 
     def train_test(self):
         return train_test_split(self.X, self.y)
 
     def retrain_model(self):
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(self.X, self.y)
+        self.split = train_test_split(self.X, self.y)
         self.linreg = self.fit_model()
+        self.pred_frame.set_predictor('yur', self.linreg)
 
     def fit_model(self):
+        # imported here so that serving a saved model does not import AutoGluon until it is used
+        from autogluon.tabular import TabularPredictor
         linreg = TabularPredictor(label='recession_in_next_year').fit(train_data=self.X_train,
                                                                       presets='best_quality',
                                                                       hyperparameters={'GBM': {},
@@ -47,24 +84,20 @@ class YURModel:
 
     def get_present_data(self):
         # Predictions for the most recent year
-        present_data = self.total_data[self.total_data['recession_in_next_year'].isnull()].copy()
-        present_data.loc[:, 'yur_pred'] = self.linreg.predict(present_data)
-        return present_data[['date', 'yur_pred']]
+        preds = self.pred_frame.get()
+        present = self.total_data['recession_in_next_year'].isnull()
+        present_data = self.total_data.loc[present, ['date']]
+        present_data['yur_pred'] = preds.loc[present, 'YUR_Prediction']
+        return present_data
 
     def get_preds_table(self, preds_df=None):
         # Makes a prediction for all entries in the table based on the model
+        preds = self.pred_frame.get()
+        preds_table = self.total_data[['date', 'recession_in_next_year', 'years_until_recession']].copy()
+        preds_table['yur_pred'] = preds['YUR_Prediction']
         if preds_df is None:
-            preds_table = self.total_data.copy()
-            preds_table = preds_table[preds_table['in_recession'] == 0]
-            lin_preds = self.linreg.predict(preds_table)
-            preds_table['yur_pred'] = lin_preds
-            preds_table = preds_table[['date', 'recession_in_next_year', 'years_until_recession', 'yur_pred']]
-            return preds_table
+            return preds_table[self.total_data['in_recession'] == 0]
         else:
-            preds_table = self.total_data.copy()
-            lin_preds = self.linreg.predict(preds_table)
-            preds_table['yur_pred'] = lin_preds
-            preds_table = preds_table[['date', 'recession_in_next_year', 'years_until_recession', 'yur_pred']]
             preds_df = preds_df.merge(preds_table, on=['date', 'recession_in_next_year'], how='inner')
             return preds_df
 
@@ -85,5 +118,20 @@ class YURModel:
                      'yield_diff': [yd],
                      'yield_below_zero': [int(yd < 0)],
                      'years_since_recession': [ysr]}
-        pred = self.linreg.predict(pd.DataFrame(pred_dict))
-        return round(pred[0], 3)
+        features = {name: values[0] for name, values in pred_dict.items()}
+        # the served version and its predictor are read once, so the prediction is cached under the version
+        # that made it even if a new one is swapped in meanwhile
+        version, predictor = get_served(self.linreg)
+        return self.pred_cache.get(predictor, features, version=version,
+                                   compute=lambda: round(predictor.predict(pd.DataFrame(pred_dict))[0], 3))
+
+    # scores many scenarios in one predictor call and returns their years until recession as an array,
+    # equal to calling make_pred on each row
+    # takes arrays (or scalars) in make_pred's argument order, or a DataFrame of feature rows as house
+    def make_pred_batch(self, house=0, cpi=0, yd=0, ysr=0, un=0):
+        preds = self.linreg.predict(get_pred_frame(house, cpi, yd, ysr, un)).values
+        return np.round(preds, 3)
+
+    # returns the make_pred cache hit and miss counts
+    def get_cache_info(self):
+        return self.pred_cache.info()
@@ -1,16 +1,24 @@
 # This file will contain a class that represents the RINY model
 
 # import machine learning packages
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn import metrics
-from autogluon.tabular import TabularPredictor
+from CodeBase.Model.prediction_cache import PredictionCache
+from CodeBase.Model.lazy_predictor import LazyPredictor
+from CodeBase.Model.model_registry import get_served
+from CodeBase.Model.model_inputs import get_pred_frame
+from CodeBase.Model.predictions import PredictionFrame
 
 
 class RINYModel:
 
-    def __init__(self, total_data, model=None):
+    # model: a fitted TabularPredictor, the path of a saved one to load on first use, or None to fit one
+    # cache_size/cache_ttl: bounds of the make_pred cache, see PredictionCache
+    def __init__(self, total_data, model=None, cache_size=1024, cache_ttl=None):
         self.total_data = total_data
+        self.pred_cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
         self.riny_columns = ['date', 'housing_climb_change', '36_mo_cpi_change_all', 'un_rate',
                              'yield_diff', 'yield_below_zero',
                              'years_since_recession', 'years_until_recession',
@@ -22,20 +30,49 @@ class RINYModel:
                                'yield_diff', 'yield_below_zero',
                                'years_since_recession']]
         self.y = self.riny_df[['recession_in_next_year']]
-        self.X_train, self.X_test, self.y_train, self.y_test = self.train_test()
+        # the train/test split is only made when something needs it, serving never does
+        self.split = None
         if model is None:
             self.logreg = self.fit_model()
+        elif isinstance(model, str):
+            self.logreg = LazyPredictor(model)
         else:
             self.logreg = model
+        # predictions for the whole table, made once; the dashboard replaces it with the frame it shares with YUR
+        self.pred_frame = PredictionFrame(self.total_data, riny_predictor=self.logreg)
+
+    @property
+    def X_train(self):
+        return self.get_split()[0]
+
+    @property
+    def X_test(self):
+        return self.get_split()[1]
+
+    @property
+    def y_train(self):
+        return self.get_split()[2]
+
+    @property
+    def y_test(self):
+        return self.get_split()[3]
+
+    def get_split(self):
+        if self.split is None:
+            self.split = self.train_test()
+        return self.split
 
     def train_test(self):
         return train_test_split(self.X, self.y)
 
     def retrain_model(self):
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(self.X, self.y)
+        self.split = train_test_split(self.X, self.y)
         self.logreg = self.fit_model()
+        self.pred_frame.set_predictor('riny', self.logreg)
 
     def fit_model(self):
+        # imported here so that serving a saved model does not import AutoGluon until it is used
+        from autogluon.tabular import TabularPredictor
         logreg = TabularPredictor(label='recession_in_next_year').fit(
                                   train_data=self.X_train, presets='best_quality')
         return logreg
@@ -57,21 +94,19 @@ class RINYModel:
 
     def get_present_data(self):
         # Predictions for the most recent year
-        present_data = self.total_data[(self.total_data['recession_in_next_year'].isnull())]
-        present_data['riny_pred_bin'] = self.logreg.predict(present_data)
-        prob_preds = self.logreg.predict_proba(present_data)
-        present_data['riny_pred_prob'] = prob_preds[1].values
-        return present_data[['date', 'riny_pred_bin', 'riny_pred_prob']]
+        preds = self.pred_frame.get()
+        present = self.total_data['recession_in_next_year'].isnull()
+        present_data = self.total_data.loc[present, ['date']]
+        present_data['riny_pred_bin'] = preds.loc[present, 'RINY_prediction']
+        present_data['riny_pred_prob'] = preds.loc[present, 'RINY_prediction_probability']
+        return present_data
 
     def get_preds_table(self):
         # Makes a prediction for all entries in the table based on the model
-        preds_table = self.total_data.copy()
-        log_preds = self.logreg.predict(preds_table)
-        prob_preds = self.logreg.predict_proba(preds_table)
-        prob_preds = prob_preds[1].values
-        preds_table['riny_pred_bin'] = log_preds
-        preds_table['riny_pred_prob'] = prob_preds
-        preds_table = preds_table[['date', 'recession_in_next_year', 'riny_pred_bin', 'riny_pred_prob']]
+        preds = self.pred_frame.get()
+        preds_table = self.total_data[['date', 'recession_in_next_year']].copy()
+        preds_table['riny_pred_bin'] = preds['RINY_prediction']
+        preds_table['riny_pred_prob'] = preds['RINY_prediction_probability']
         return preds_table
 
     def get_train_indices(self):
@@ -97,5 +132,21 @@ class RINYModel:
                      'yield_diff': [yd],
                      'yield_below_zero': [int(yd < 0)],
                      'years_since_recession': [ysr]}
-        pred = self.logreg.predict_proba(pd.DataFrame(pred_dict))
-        return round(pred.iloc[0][1], 3)
+        features = {name: values[0] for name, values in pred_dict.items()}
+        # the served version and its predictor are read once, so the prediction is cached under the version
+        # that made it even if a new one is swapped in meanwhile
+        version, predictor = get_served(self.logreg)
+        return self.pred_cache.get(predictor, features, version=version,
+                                   compute=lambda: round(
+                                       predictor.predict_proba(pd.DataFrame(pred_dict)).iloc[0][1], 3))
+
+    # scores many scenarios in one predictor call and returns their recession probabilities as an array,
+    # equal to calling make_pred on each row
+    # takes arrays (or scalars) in make_pred's argument order, or a DataFrame of feature rows as house
+    def make_pred_batch(self, house=0, cpi=0, yd=0, ysr=0, un=0):
+        preds = self.logreg.predict_proba(get_pred_frame(house, cpi, yd, ysr, un))[1].values
+        return np.round(preds, 3)
+
+    # returns the make_pred cache hit and miss counts
+    def get_cache_info(self):
+        return self.pred_cache.info()
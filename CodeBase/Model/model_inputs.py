@@ -0,0 +1,26 @@
+# This file contains helpers for turning Model Calculator inputs into the feature frame the predictors expect
+import numpy as np
+import pandas as pd
+
+# the feature columns in the order make_pred builds them
+feature_columns = ['un_rate', 'housing_climb_change', '36_mo_cpi_change_all', 'yield_diff',
+                   'yield_below_zero', 'years_since_recession']
+
+
+# returns one feature row per scenario
+# house, cpi, yd, ysr and un are arrays of equal length or scalars broadcast to that length,
+# or house is a DataFrame with the feature columns (yield_below_zero is derived from yield_diff if missing)
+def get_pred_frame(house=0, cpi=0, yd=0, ysr=0, un=0):
+    if isinstance(house, pd.DataFrame):
+        pred_df = house.copy()
+        if 'yield_below_zero' not in pred_df.columns:
+            pred_df['yield_below_zero'] = (pred_df['yield_diff'] < 0).astype(int)
+        return pred_df[feature_columns].reset_index(drop=True)
+
+    house, cpi, yd, ysr, un = np.broadcast_arrays(*[np.asarray(v) for v in [house, cpi, yd, ysr, un]])
+    return pd.DataFrame({'un_rate': np.atleast_1d(un),
+                         'housing_climb_change': np.atleast_1d(house),
+                         '36_mo_cpi_change_all': np.atleast_1d(cpi),
+                         'yield_diff': np.atleast_1d(yd),
+                         'yield_below_zero': np.atleast_1d(yd < 0).astype(int),
+                         'years_since_recession': np.atleast_1d(ysr)})
@@ -0,0 +1,205 @@
+# This file contains a versioned registry of saved TabularPredictors and a predictor that follows it
+# Each task (riny, yur) keeps its versions under <registry>/<task>/versions/<version>/ and a pointer file naming
+# the current and previous versions, which is replaced atomically, so a reader sees either the old or the new pointer
+# HotSwapPredictor watches the pointer from a background thread, loads a newly promoted version there and then swaps
+# it in, so requests keep being served by the old version until the new one is ready, and keeps the version it
+# replaced loaded so a rollback takes effect at once
+# Ex. python -m CodeBase.Model.model_registry register riny mysite/CodeBase/Model/saved_models/AutogluonModels/riny_model
+#     python -m CodeBase.Model.model_registry promote riny 20240901-120000
+#     python -m CodeBase.Model.model_registry rollback riny
+import argparse
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from CodeBase.Model.lazy_predictor import LazyPredictor
+
+default_registry_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_models', 'registry')
+
+
+class ModelRegistry:
+
+    def __init__(self, registry_dir=default_registry_dir):
+        self.registry_dir = registry_dir
+
+    def get_versions_dir(self, task):
+        return os.path.join(self.registry_dir, task, 'versions')
+
+    def get_path(self, task, version):
+        return os.path.join(self.get_versions_dir(task), version)
+
+    def get_pointer_path(self, task):
+        return os.path.join(self.registry_dir, task, 'pointer.json')
+
+    def versions(self, task):
+        if not os.path.exists(self.get_versions_dir(task)):
+            return []
+        return sorted(v for v in os.listdir(self.get_versions_dir(task)) if not v.startswith('.'))
+
+    # copies a saved predictor into the registry as a new version, without promoting it
+    # the copy is made under a temporary name and renamed into place, so a version is never seen half written
+    def register(self, task, predictor_path, version=None):
+        version = version or datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        if os.path.exists(self.get_path(task, version)):
+            raise ValueError('Version ' + version + ' of ' + task + ' is already registered')
+        os.makedirs(self.get_versions_dir(task), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.' + version + '_', dir=self.get_versions_dir(task))
+        shutil.copytree(predictor_path, staging, dirs_exist_ok=True)
+        os.rename(staging, self.get_path(task, version))
+        return version
+
+    # returns {'current': version, 'previous': version, 'has_previous': bool}, where a version of None is the
+    # predictor outside the registry (see HotSwapPredictor's fallback_path), which is served until a version is
+    # promoted and can be rolled back to after that
+    def get_pointer(self, task):
+        try:
+            with open(self.get_pointer_path(task)) as f:
+                pointer = json.load(f)
+        except FileNotFoundError:
+            return {'current': None, 'previous': None, 'has_previous': False}
+        pointer.setdefault('has_previous', pointer['previous'] is not None)
+        return pointer
+
+    def write_pointer(self, task, pointer):
+        os.makedirs(os.path.dirname(self.get_pointer_path(task)), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.pointer_', dir=os.path.dirname(self.get_pointer_path(task)))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(pointer, f)
+        os.replace(tmp_path, self.get_pointer_path(task))
+
+    def get_current(self, task):
+        return self.get_pointer(task)['current']
+
+    # makes version the current one and the current one the previous one
+    def promote(self, task, version):
+        if version not in self.versions(task):
+            raise ValueError('Version ' + version + ' of ' + task + ' is not registered')
+        pointer = self.get_pointer(task)
+        if pointer['current'] != version:
+            self.write_pointer(task, {'current': version, 'previous': pointer['current'], 'has_previous': True})
+
+    # swaps the current and previous versions back, after the first promotion back to the predictor outside the
+    # registry
+    def rollback(self, task):
+        pointer = self.get_pointer(task)
+        if not pointer['has_previous']:
+            raise ValueError('There is no previous version of ' + task + ' to roll back to')
+        self.write_pointer(task, {'current': pointer['previous'], 'previous': pointer['current'], 'has_previous': True})
+
+
+# a stand-in for the current version's predictor that follows promotions and rollbacks in the background
+# fallback_path: the predictor used while the registry has no current version for the task
+# listeners are called with this predictor after every swap, Ex. to drop cached predictions
+class HotSwapPredictor:
+
+    def __init__(self, registry, task, fallback_path=None, poll_interval=30.):
+        self.registry = registry
+        self.task = task
+        self.fallback_path = fallback_path
+        self.poll_interval = poll_interval
+        self.version = registry.get_current(task)
+        self.current = LazyPredictor(self.get_version_path(self.version))
+        self.previous = None
+        self.previous_version = None
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.watcher = None
+
+    def get_version_path(self, version):
+        if version is None:
+            return self.fallback_path
+        return self.registry.get_path(self.task, version)
+
+    # the path of the version being served, Ex. to check the predictions artifact against
+    def get_path(self):
+        return self.current.path
+
+    # the version being served and its predictor, read together so a prediction can be tied to the version that made it
+    def get_served(self):
+        with self.lock:
+            return self.version, self.current
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    # loads the registry's current version if it is not the one being served and swaps it in
+    # the version being replaced is kept loaded as the previous one
+    def refresh(self):
+        version = self.registry.get_current(self.task)
+        if version == self.version:
+            return False
+        if self.previous is not None and version == self.previous_version:
+            new = self.previous
+        else:
+            new = LazyPredictor(self.get_version_path(version))
+            new.load()
+        with self.lock:
+            self.previous, self.previous_version = self.current, self.version
+            self.current, self.version = new, version
+        for listener in self.listeners:
+            listener(self)
+        return True
+
+    def watch(self):
+        while not self.stopped.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # a version that fails to load is not swapped in and is tried again at the next poll
+                print('Could not swap in', self.task, 'version', self.registry.get_current(self.task), ':', e)
+
+    # starts following the registry in a daemon thread
+    def start(self):
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=self.watch, name=self.task + '-registry-watcher', daemon=True)
+            self.watcher.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    # any predictor attribute (predict, predict_proba, ...) is that of the version being served
+    def __getattr__(self, name):
+        if name in ['registry', 'task', 'current', 'lock']:
+            raise AttributeError(name)
+        with self.lock:
+            current = self.current
+        return getattr(current, name)
+
+
+# returns (version, predictor) for a HotSwapPredictor's served version, or (None, predictor) for any other predictor
+def get_served(predictor):
+    if isinstance(predictor, HotSwapPredictor):
+        return predictor.get_served()
+    return None, predictor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Manage the versions of the saved models')
+    parser.add_argument('action', choices=['list', 'register', 'promote', 'rollback'])
+    parser.add_argument('task', choices=['riny', 'yur'])
+    parser.add_argument('arg', nargs='?', help='register: the saved predictor directory, promote: the version')
+    parser.add_argument('--registry', default=default_registry_dir)
+    parser.add_argument('--promote', action='store_true', help='register: also promote the new version')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.action == 'register':
+        version = registry.register(args.task, args.arg)
+        if args.promote:
+            registry.promote(args.task, version)
+        print(version)
+    elif args.action == 'promote':
+        registry.promote(args.task, args.arg)
+    elif args.action == 'rollback':
+        registry.rollback(args.task)
+    pointer = registry.get_pointer(args.task)
+    for version in registry.versions(args.task):
+        print(version, '(current)' if version == pointer['current'] else
+              '(previous)' if version == pointer['previous'] else '')
+    if pointer['current'] is None:
+        print('No version is current, the saved models outside the registry are served')
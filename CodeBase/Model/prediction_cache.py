@@ -0,0 +1,59 @@
+# This file contains a bounded cache of single-row model predictions for the Model Calculator
+import threading
+
+from cachetools import LRUCache, TTLCache
+
+missing = object()
+
+
+class PredictionCache:
+
+    # maxsize: the most feature vectors kept, least recently used ones are dropped first, 0 disables the cache
+    # ttl: seconds a prediction is kept for, None keeps it until it is pushed out
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cache = self.new_cache()
+        self.predictor = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def new_cache(self):
+        if self.ttl is None:
+            return LRUCache(maxsize=self.maxsize)
+        return TTLCache(maxsize=self.maxsize, ttl=self.ttl)
+
+    # the cache key: the feature values in column order, as floats so 0 and 0.0 share an entry
+    @staticmethod
+    def get_key(features):
+        return tuple((name, float(value)) for name, value in features.items())
+
+    # returns the cached prediction for these features, calling compute() on a miss
+    # everything cached is dropped when a different predictor or model version is passed in, e.g. after retraining
+    # or a registry swap, and a prediction computed for a version that is no longer the cached one is not kept
+    def get(self, predictor, features, compute, version=None):
+        key = self.get_key(features)
+        with self.lock:
+            if predictor is not self.predictor or version != self.version:
+                self.cache = self.new_cache()
+                self.predictor, self.version = predictor, version
+            pred = self.cache.get(key, missing)
+            if pred is not missing:
+                self.hits += 1
+                return pred
+            self.misses += 1
+        pred = compute()
+        with self.lock:
+            if predictor is self.predictor and version == self.version and self.maxsize > 0:
+                self.cache[key] = pred
+        return pred
+
+    def clear(self):
+        with self.lock:
+            self.cache = self.new_cache()
+
+    def info(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.cache), 'maxsize': self.maxsize}
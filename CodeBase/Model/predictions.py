@@ -0,0 +1,127 @@
+# This file contains the prediction frame shared by the models and the dashboard, and methods for
+# the precomputed predictions artifact read by the dashboard
+# The data refresh job scores the whole total table once with the registry's current models and saves the results
+# next to it, with the table and model versions they were made from, so dashboard workers serving the same versions
+# can start without loading the predictors
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import CodeBase.Data.storage as storage
+from CodeBase.Model.lazy_predictor import get_model_version
+from CodeBase.Model.model_registry import get_served
+
+prediction_columns = ['YUR_Prediction', 'RINY_prediction', 'RINY_prediction_probability']
+# the prediction columns each model fills
+task_columns = {'riny': ['RINY_prediction', 'RINY_prediction_probability'], 'yur': ['YUR_Prediction']}
+
+
+def get_predictions_path(total_data_path):
+    return os.path.join(os.path.dirname(total_data_path), 'predictions.csv')
+
+
+# the versions the saved predictions were made from, see get_versions
+def get_versions_path(total_data_path):
+    return os.path.join(os.path.dirname(total_data_path), 'predictions.json')
+
+
+def get_file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+
+# what predictions made now would be made from: a hash of the total table's CSV and, for each model, the registry
+# version being served (None for the saved model outside the registry) and a hash of its files, which also tells
+# apart a saved model retrained in place
+def get_versions(total_data_path, served):
+    versions = {'total_data': get_file_hash(total_data_path)}
+    for task, (version, predictor) in served.items():
+        versions[task] = {'version': version, 'model': get_model_version(predictor.path)}
+    return versions
+
+
+# scores every row of the total table with one call to each predictor, leaving out a model whose predictor is None
+# the RINY class is taken from its probabilities instead of running the ensemble a second time,
+# the positive (last) class when its probability is at least 0.5, as TabularPredictor.predict does for binary labels
+def compute_predictions(total_data, riny_predictor, yur_predictor):
+    preds = pd.DataFrame({'date': total_data['date'].values}, index=total_data.index)
+    if yur_predictor is not None:
+        preds['YUR_Prediction'] = yur_predictor.predict(total_data).values
+    if riny_predictor is not None:
+        prob_preds = riny_predictor.predict_proba(total_data)
+        negative_class, positive_class = prob_preds.columns[0], prob_preds.columns[-1]
+        preds['RINY_prediction'] = np.where(prob_preds[positive_class].values >= 0.5, positive_class, negative_class)
+        preds['RINY_prediction_probability'] = prob_preds[1].values
+    return preds
+
+
+# the predictions of both models for every row of one total table, made in a single inference pass
+# the first time they are needed and then read by get_present_data, get_preds_table and the dashboard
+class PredictionFrame:
+
+    # preds: predictions already made for total_data, Ex. the saved artifact, used instead of scoring it again
+    def __init__(self, total_data, riny_predictor=None, yur_predictor=None, preds=None):
+        self.total_data = total_data
+        self.predictors = {'riny': riny_predictor, 'yur': yur_predictor}
+        self.preds = None
+        if preds is not None:
+            self.preds = preds.set_axis(total_data.index)
+        self.lock = threading.Lock()
+
+    # swaps in a retrained predictor, its predictions are made again the next time they are read
+    def set_predictor(self, task, predictor):
+        with self.lock:
+            self.predictors[task] = predictor
+            if self.preds is not None:
+                self.preds = self.preds.drop(columns=task_columns[task], errors='ignore')
+
+    # returns the prediction frame, indexed like total_data, scoring the table for any model not yet scored
+    def get(self):
+        with self.lock:
+            missing = [task for task, predictor in self.predictors.items() if predictor is not None and
+                       (self.preds is None or task_columns[task][0] not in self.preds.columns)]
+            if missing:
+                new_preds = compute_predictions(self.total_data, *[self.predictors[task] if task in missing
+                                                                   else None for task in ['riny', 'yur']])
+                if self.preds is None:
+                    self.preds = new_preds
+                else:
+                    self.preds = self.preds.join(new_preds.drop(columns=['date']))
+            return self.preds
+
+
+# scores the table with the versions riny_predictor and yur_predictor serve (Ex. HotSwapPredictors of the registry)
+# and saves the predictions with those versions
+# the old versions are removed first, so predictions are never read with versions they were not made from
+def write_predictions(total_data, total_data_path, riny_predictor, yur_predictor):
+    served = {'riny': get_served(riny_predictor), 'yur': get_served(yur_predictor)}
+    preds = compute_predictions(total_data, served['riny'][1], served['yur'][1])
+    versions_path = get_versions_path(total_data_path)
+    if os.path.exists(versions_path):
+        os.remove(versions_path)
+    storage.save_total_data(preds, get_predictions_path(total_data_path))
+    with open(versions_path, 'w') as f:
+        json.dump(get_versions(total_data_path, served), f)
+    return preds
+
+
+# returns the saved predictions lined up with total_data, or None if there are none or they are stale:
+# made from another total table or from other versions than riny_predictor and yur_predictor serve,
+# or not covering exactly the same dates
+def load_predictions(total_data, total_data_path, riny_predictor, yur_predictor):
+    path = get_predictions_path(total_data_path)
+    versions_path = get_versions_path(total_data_path)
+    if not (os.path.exists(path) and os.path.exists(versions_path)):
+        return None
+    with open(versions_path) as f:
+        saved_versions = json.load(f)
+    served = {'riny': get_served(riny_predictor), 'yur': get_served(yur_predictor)}
+    if saved_versions != get_versions(total_data_path, served):
+        return None
+    preds = storage.load_total_data(path)
+    if list(preds['date']) != list(total_data['date']):
+        return None
+    return preds
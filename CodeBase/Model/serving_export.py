@@ -0,0 +1,88 @@
+# This file builds serving variants of a trained TabularPredictor, trading accuracy for predict latency
+# and disk size, and reports each variant's test score, latency and size so one can be picked deliberately
+#   slim: the trained predictor with models the best one does not use and training-only artifacts deleted
+#   pruned: slim, with ensemble members below a weight threshold dropped and the ensemble refit on the rest
+#   refit_full: slim, with every bagged member refit as one model on all the data (no 5 fold bags)
+#   pruned_refit_full: pruned, then refit_full
+import os
+import shutil
+import time
+
+import pandas as pd
+
+variants = ['slim', 'pruned', 'refit_full', 'pruned_refit_full']
+
+
+def get_dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+# returns the weight of each member of the predictor's best (weighted ensemble) model,
+# or None if the best model is not a weighted ensemble
+# there is no public API for the weights, this reads the trainer's private state as laid out in autogluon 0.5.2
+def get_ensemble_weights(predictor):
+    try:
+        return predictor._trainer.load_model(predictor.get_model_best())._get_model_weights()
+    except AttributeError:
+        return None
+
+
+# refits the best ensemble on its members weighing at least threshold, keeping it as is if it has no weights
+def prune_ensemble(predictor, threshold):
+    weights = get_ensemble_weights(predictor)
+    if not weights:
+        print('Not pruning', predictor.path, ': its best model has no ensemble weights')
+        return
+    kept = [model for model, weight in weights.items() if weight >= threshold]
+    ensemble = predictor.fit_weighted_ensemble(base_models=kept, name_suffix='Pruned')[0]
+    predictor.set_model_best(ensemble)
+    predictor.save()
+
+
+def slim(predictor):
+    predictor.delete_models(models_to_keep='best', dry_run=False)
+    predictor.save_space()
+
+
+# copies the saved predictor to path and turns the copy into the variant
+# a variant left at path by an earlier export is removed first, so none of its models survive into the new one
+def make_variant(predictor, variant, path, prune_threshold):
+    from autogluon.tabular import TabularPredictor
+    shutil.rmtree(path, ignore_errors=True)
+    shutil.copytree(predictor.path, path)
+    clone = TabularPredictor.load(path)
+    if variant in ['pruned', 'pruned_refit_full']:
+        prune_ensemble(clone, prune_threshold)
+    if variant in ['refit_full', 'pruned_refit_full']:
+        clone.refit_full(model='best', set_best_to_refit_full=True)
+    slim(clone)
+    return clone
+
+
+def get_report(predictor, path, test_data, single_calls=20):
+    score = predictor.evaluate(test_data, silent=True)[predictor.eval_metric.name]
+    test_features = test_data.drop(columns=[predictor.label])
+    predictor.predict(test_features.iloc[[0]])  # loads the models before timing
+    start = time.perf_counter()
+    for i in range(single_calls):
+        predictor.predict(test_features.iloc[[i % len(test_features)]])
+    single = (time.perf_counter() - start) / single_calls
+    start = time.perf_counter()
+    predictor.predict(test_features)
+    batch = time.perf_counter() - start
+    return {'score': score, 'metric': predictor.eval_metric.name, 'best_model': predictor.get_model_best(),
+            'single_row_predict_s': single, 'batch_predict_s': batch, 'batch_rows': len(test_features),
+            'size_mb': get_dir_size(path) / 2 ** 20}
+
+
+# saves each serving variant next to the trained predictor as <path>_<variant> and returns their reports,
+# with the trained predictor itself as 'full', also written to <path>_serving_report.json
+def export_serving_variants(predictor, test_data, prune_threshold=0.05):
+    base_path = predictor.path.rstrip('/').rstrip(os.sep)
+    reports = {'full': get_report(predictor, base_path, test_data)}
+    for variant in variants:
+        path = base_path + '_' + variant
+        reports[variant] = get_report(make_variant(predictor, variant, path, prune_threshold), path, test_data)
+    reports = pd.DataFrame(reports).T
+    reports.to_json(base_path + '_serving_report.json', orient='index', indent=2)
+    return reports
@@ -1,48 +1,66 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split #splitting the dataset
 from autogluon.tabular import TabularDataset, TabularPredictor #to handle tabular data and train models
+from CodeBase.Data.storage import load_total_data
+from CodeBase.Model.serving_export import export_serving_variants
+from CodeBase.Model.feature_importance import get_feature_importance
 
-# Classification Model
-total_data = pd.read_csv('mysite/CodeBase/Data/total_data.csv', index_col=0)
-riny_model_data = total_data[(~total_data['recession_in_next_year'].isnull())]
-yur_model_data = total_data[(~total_data['years_until_recession'].isnull())]
+# set to True to also build the slim/pruned/refit_full serving variants of each model
+export_serving = False
 
-riny_model_data = riny_model_data[['un_rate','housing_climb_change', '36_mo_cpi_change_all',
-                                   'yield_diff', 'yield_below_zero', 'years_since_recession',
-                                   'recession_in_next_year']]
+# the feature importance runs in a process pool, whose spawned workers import this module again,
+# so training only runs when the script itself is run
+if __name__ == "__main__":
+    # Classification Model
+    total_data = load_total_data('mysite/CodeBase/Data/total_data.csv',
+                                 columns=['un_rate', 'housing_climb_change', '36_mo_cpi_change_all',
+                                          'yield_diff', 'yield_below_zero', 'years_since_recession',
+                                          'recession_in_next_year', 'years_until_recession'])
+    riny_model_data = total_data[(~total_data['recession_in_next_year'].isnull())]
+    yur_model_data = total_data[(~total_data['years_until_recession'].isnull())]
 
-riny_train, riny_test = train_test_split(riny_model_data)
-riny_test_data = riny_test.drop(['recession_in_next_year'],axis=1)
+    riny_model_data = riny_model_data[['un_rate','housing_climb_change', '36_mo_cpi_change_all',
+                                       'yield_diff', 'yield_below_zero', 'years_since_recession',
+                                       'recession_in_next_year']]
 
-predictor = TabularPredictor(label='recession_in_next_year',
-                             path='mysite/CodeBase/Model/saved_models/AutogluonModels/riny_model').fit(
-    train_data = riny_train, presets='best_quality')
+    riny_train, riny_test = train_test_split(riny_model_data)
+    riny_test_data = riny_test.drop(['recession_in_next_year'],axis=1)
 
-print(predictor.fit_summary())
+    predictor = TabularPredictor(label='recession_in_next_year',
+                                 path='mysite/CodeBase/Model/saved_models/AutogluonModels/riny_model').fit(
+        train_data = riny_train, presets='best_quality')
 
-print(predictor.leaderboard(riny_train, silent=True))
+    print(predictor.fit_summary())
 
-print(predictor.feature_importance(data=riny_train))
+    print(predictor.leaderboard(riny_train, silent=True))
 
-print(predictor.evaluate(riny_test))
+    print(get_feature_importance(predictor, riny_train))
 
+    print(predictor.evaluate(riny_test))
 
-# Linear Model
-yur_model_data = yur_model_data[['un_rate','housing_climb_change', '36_mo_cpi_change_all',
-                                 'yield_diff', 'yield_below_zero', 'years_since_recession',
-                                 'years_until_recession']]
+    if export_serving:
+        print(export_serving_variants(predictor, riny_test))
 
-yur_train,yur_test = train_test_split(yur_model_data)
-yur_test_data=yur_test.drop(['years_until_recession'],axis=1)
-predictor= TabularPredictor(label='years_until_recession',
-                            path='mysite/CodeBase/Model/saved_models/AutogluonModels/yur_model').fit(
-    train_data = yur_train, presets='best_quality'
-)
 
-print(predictor.fit_summary())
+    # Linear Model
+    yur_model_data = yur_model_data[['un_rate','housing_climb_change', '36_mo_cpi_change_all',
+                                     'yield_diff', 'yield_below_zero', 'years_since_recession',
+                                     'years_until_recession']]
 
-print(predictor.leaderboard(yur_train, silent=True))
+    yur_train,yur_test = train_test_split(yur_model_data)
+    yur_test_data=yur_test.drop(['years_until_recession'],axis=1)
+    predictor= TabularPredictor(label='years_until_recession',
+                                path='mysite/CodeBase/Model/saved_models/AutogluonModels/yur_model').fit(
+        train_data = yur_train, presets='best_quality'
+    )
 
-print(predictor.feature_importance(data=yur_train))
+    print(predictor.fit_summary())
 
-print(predictor.evaluate(yur_test))
\ No newline at end of file
+    print(predictor.leaderboard(yur_train, silent=True))
+
+    print(get_feature_importance(predictor, yur_train))
+
+    print(predictor.evaluate(yur_test))
+
+    if export_serving:
+        print(export_serving_variants(predictor, yur_test))
@@ -0,0 +1,139 @@
+# This file trains the RINY classifier and the YUR regressor at the same time, each in its own process,
+# under a shared CPU budget and a time limit, with pinned seeds, and writes a run report with the wall time
+# and fit time per model family and the final test metrics of each model
+# Ex. python -m CodeBase.Model.train_orchestrator --cpus 8 --time-limit 3600 --seed 0
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+from CodeBase.Data.storage import load_total_data
+from CodeBase.Model.model_inputs import feature_columns
+from CodeBase.Model.model_registry import ModelRegistry
+
+total_data_path = 'mysite/CodeBase/Data/total_data.csv'
+models_dir = 'mysite/CodeBase/Model/saved_models/AutogluonModels/'
+report_path = models_dir + 'train_report.json'
+
+# label and save directory of each model
+model_specs = {'riny': {'label': 'recession_in_next_year', 'path': models_dir + 'riny_model'},
+               'yur': {'label': 'years_until_recession', 'path': models_dir + 'yur_model'}}
+
+
+# limits the math libraries of a worker process to its share of the CPU budget, before they are imported
+def limit_threads(num_cpus):
+    for var in ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']:
+        os.environ[var] = str(num_cpus)
+
+
+# the model family of an AutoGluon model name, Ex. LightGBMXT_BAG_L1 -> LightGBMXT
+def get_family(model_name):
+    return model_name.split('_')[0]
+
+
+# returns the total fit time and number of models of each model family on the leaderboard
+def get_family_times(leaderboard):
+    families = {}
+    for _, row in leaderboard.iterrows():
+        family = families.setdefault(get_family(row['model']), {'fit_time_s': 0., 'models': 0})
+        family['fit_time_s'] += float(row['fit_time_marginal'])
+        family['models'] += 1
+    return families
+
+
+# fits and evaluates one model, run in a worker process
+# AutoGluon seeds its models and bagging folds with fixed defaults, so pinning the split and the global
+# random generators is enough for a rerun on the same data and budget to train the same models
+def train_model(task, num_cpus, time_limit, seed, presets='best_quality', export_serving=False):
+    limit_threads(num_cpus)
+    random.seed(seed)
+    np.random.seed(seed)
+    from autogluon.tabular import TabularPredictor
+
+    start = time.perf_counter()
+    label = model_specs[task]['label']
+    total_data = load_total_data(total_data_path, columns=feature_columns + [label])
+    model_data = total_data[~total_data[label].isnull()]
+    train, test = train_test_split(model_data, random_state=seed)
+
+    fit_start = time.perf_counter()
+    # autogluon 0.5.2 takes the CPU limit per model through ag_args_fit, fit itself has no num_cpus argument
+    predictor = TabularPredictor(label=label, path=model_specs[task]['path']).fit(
+        train_data=train, presets=presets, time_limit=time_limit, ag_args_fit={'num_cpus': num_cpus})
+    fit_time = time.perf_counter() - fit_start
+
+    leaderboard = predictor.leaderboard(test, silent=True)
+    report = {'num_cpus': num_cpus, 'seed': seed, 'rows_train': len(train), 'rows_test': len(test),
+              'fit_wall_time_s': fit_time,
+              'best_model': predictor.get_model_best(),
+              'metrics': {name: float(value)
+                          for name, value in predictor.evaluate(test, silent=True).items()},
+              'families': get_family_times(leaderboard)}
+    if export_serving:
+        from CodeBase.Model.serving_export import export_serving_variants
+        report['serving_variants'] = json.loads(export_serving_variants(predictor, test).to_json(orient='index'))
+    report['wall_time_s'] = time.perf_counter() - start
+    return report
+
+
+# splits the CPU budget evenly between the tasks, giving any remainder to the first ones
+def split_cpus(cpu_budget, tasks):
+    shares = [cpu_budget // len(tasks)] * len(tasks)
+    for i in range(cpu_budget % len(tasks)):
+        shares[i] += 1
+    return {task: max(share, 1) for task, share in zip(tasks, shares)}
+
+
+# trains the tasks concurrently (or one after the other if parallel is False) and writes the run report
+# cpu_budget: CPUs shared by all fits, defaults to every CPU of the machine
+# time_limit: seconds each fit may take, the fits run side by side so this bounds the whole run
+# promote: register the trained models as new versions in the model registry and make them current
+def run_training(tasks=('riny', 'yur'), cpu_budget=None, time_limit=None, seed=0, presets='best_quality',
+                 parallel=True, export_serving=False, report_path=report_path, promote=False):
+    tasks = list(tasks)
+    cpu_budget = cpu_budget or os.cpu_count()
+    start = time.perf_counter()
+    if parallel:
+        cpus = split_cpus(cpu_budget, tasks)
+        # spawned rather than forked so each worker starts its own AutoGluon and thread pools
+        with ProcessPoolExecutor(max_workers=len(tasks), mp_context=get_context('spawn')) as pool:
+            futures = {task: pool.submit(train_model, task, cpus[task], time_limit, seed, presets, export_serving)
+                       for task in tasks}
+            results = {task: future.result() for task, future in futures.items()}
+    else:
+        results = {task: train_model(task, cpu_budget, time_limit, seed, presets, export_serving)
+                   for task in tasks}
+    if promote:
+        registry = ModelRegistry()
+        for task in tasks:
+            results[task]['version'] = registry.register(task, model_specs[task]['path'])
+            registry.promote(task, results[task]['version'])
+    report = {'cpu_budget': cpu_budget, 'time_limit_s': time_limit, 'seed': seed, 'presets': presets,
+              'parallel': parallel, 'wall_time_s': time.perf_counter() - start, 'models': results}
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the RINY and YUR models side by side under a budget')
+    parser.add_argument('--tasks', nargs='+', default=['riny', 'yur'], choices=list(model_specs))
+    parser.add_argument('--cpus', type=int, default=None, help='CPUs shared by all fits (default: all)')
+    parser.add_argument('--time-limit', type=float, default=None, help='seconds each fit may take')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--presets', default='best_quality')
+    parser.add_argument('--sequential', action='store_true', help='train the models one after the other')
+    parser.add_argument('--export-serving', action='store_true',
+                        help='also build the serving variants of each model, see serving_export.py')
+    parser.add_argument('--promote', action='store_true',
+                        help='register the trained models in the model registry and make them current')
+    parser.add_argument('--report', default=report_path)
+    args = parser.parse_args()
+    report = run_training(args.tasks, args.cpus, args.time_limit, args.seed, args.presets,
+                          not args.sequential, args.export_serving, args.report, args.promote)
+    print(json.dumps(report, indent=2))
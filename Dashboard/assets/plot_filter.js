@@ -0,0 +1,91 @@
+// This file filters the home page variable plot in the browser when the year range or the recession checklist
+// changes, from the figure and columns the server put in the plot-store (see get_plot_payload in pages/home.py),
+// redrawing it the way the Visualizer plots of the selected rows would be drawn
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    plots: {
+        filter_figure: function (payload, yearRange, inRec) {
+            if (!payload) {
+                return window.dash_clientside.no_update;
+            }
+            // with no variable selected there are no variable columns to filter, the server figure is shown as is
+            if (!payload.variables || payload.variables.length === 0) {
+                return payload.figure;
+            }
+            const columns = payload.columns;
+            const start = yearRange[0] + '-01-01';
+            const end = yearRange[1] + '-12-01';
+            // line plots always include recessions, the other plots only when the checklist is checked
+            const includeRecessions = payload.kind === 'line' || (inRec !== null && inRec !== undefined &&
+                                                                  inRec.length > 0);
+            const rows = [];
+            for (let i = 0; i < columns.date.length; i++) {
+                if (columns.date[i] >= start && columns.date[i] <= end &&
+                        (includeRecessions || columns.in_recession[i] === 0)) {
+                    rows.push(i);
+                }
+            }
+            const figure = JSON.parse(JSON.stringify(payload.figure));
+            const value = (column, i) => columns[column][i] === null ? NaN : columns[column][i];
+            const pick = (column, traceRows) => traceRows.map(i => value(column, i));
+
+            if (payload.kind === 'line' || payload.kind === 'scatter') {
+                figure.data.forEach((trace, t) => {
+                    trace.x = pick(payload.x, rows);
+                    trace.y = pick(payload.variables[t], rows);
+                });
+            } else if (payload.kind === 'solo_hist') {
+                figure.data[0].x = pick(payload.x, rows);
+            } else if (payload.kind === 'hist') {
+                let x = (i) => value(payload.variables[0], i);
+                let stats = null;
+                if (payload.variables.length > 1) {
+                    // the product of the features z-scored over the selected rows
+                    stats = {};
+                    new Set(payload.variables.concat([payload.x])).forEach(column => {
+                        const values = pick(column, rows).filter(v => !isNaN(v));
+                        const mean = values.reduce((a, b) => a + b, 0) / values.length;
+                        const variance = values.reduce((a, b) => a + (b - mean) * (b - mean), 0) /
+                            (values.length - 1);
+                        stats[column] = {mean: mean, std: Math.sqrt(variance)};
+                    });
+                    x = (i) => payload.variables.reduce(
+                        (product, column) => product * (value(column, i) - stats[column].mean) / stats[column].std, 1);
+                }
+                // like px, one trace per x value in the order the values first appear in the selected rows,
+                // colored in that order
+                const groups = [];
+                rows.forEach(i => {
+                    const group = columns[payload.x][i];
+                    if (group !== null && !groups.includes(group)) {
+                        groups.push(group);
+                    }
+                });
+                figure.data = groups.map((group, t) => {
+                    const template = payload.figure.data[payload.groups.indexOf(group)];
+                    const trace = JSON.parse(JSON.stringify(template));
+                    trace.marker.color = payload.figure.data[t].marker.color;
+                    trace.x = rows.filter(i => columns[payload.x][i] === group).map(x);
+                    if (stats !== null) {
+                        // the traces are named after the z-scored x value, which depends on the selected rows
+                        const name = String((group - stats[payload.x].mean) / stats[payload.x].std);
+                        ['name', 'legendgroup', 'offsetgroup', 'hovertemplate'].forEach(key => {
+                            trace[key] = trace[key].split(template.name).join(name);
+                        });
+                    }
+                    return trace;
+                });
+            }
+
+            if (payload.kind === 'line') {
+                // shades only the recessions that overlap the selected years
+                const dates = rows.map(i => columns.date[i]).sort();
+                figure.layout.shapes = figure.layout.shapes.filter((shape, s) => {
+                    const range = payload.shape_ranges[s];
+                    return range === null ||
+                        (dates.length > 0 && range[1] >= dates[0] && range[0] <= dates[dates.length - 1]);
+                });
+            }
+            return figure;
+        }
+    }
+});
@@ -1,263 +1,487 @@
 import dash
 import pandas as pd
-from dash import html, dcc, callback, Input, Output, dash_table
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, dash_table
 import datetime
-from CodeBase.Data.data_viz import Visualizer
+import functools
+import os
+import threading
+import time
+from CodeBase.Data.data_viz import Visualizer, recession_starts, recession_ends
+from CodeBase.Data.figure_cache import FigureCache
+from CodeBase.Data.column_schema import SchemaRegistry
 from CodeBase.Model.logistic_model import RINYModel
 from CodeBase.Model.linear_model import YURModel
-from autogluon.tabular import TabularPredictor
+from CodeBase.Data.storage import load_total_data
+from CodeBase.Model.predictions import load_predictions, compute_predictions, PredictionFrame, prediction_columns, \
+    task_columns
+from CodeBase.Model.model_registry import ModelRegistry, HotSwapPredictor
 
 dash.register_page(__name__, path='/')
 
-total_data=pd.read_csv('/home/recessionmodel/mysite/CodeBase/Data/total_data.csv', index_col=0)
+total_data_path = '/home/recessionmodel/mysite/CodeBase/Data/total_data.csv'
+yur_model_path = "/home/recessionmodel/mysite/CodeBase/Model/saved_models/AutogluonModels/yur_model/"
+riny_model_path = "/home/recessionmodel/mysite/CodeBase/Model/saved_models/AutogluonModels/riny_model/"
+registry_dir = "/home/recessionmodel/mysite/CodeBase/Model/saved_models/registry/"
 
-yur_model = TabularPredictor.load("/home/recessionmodel/mysite/CodeBase/Model/saved_models/AutogluonModels/yur_model/")
-yur = YURModel(total_data, model=yur_model)
+total_data = load_total_data(total_data_path)
+data_mtime = os.path.getmtime(total_data_path)
+# seconds between checks for a total table written by the data refresh job
+data_poll_interval = 60
 
-riny_model = TabularPredictor.load("/home/recessionmodel/mysite/CodeBase/Model/saved_models/AutogluonModels/riny_model/")
-riny = RINYModel(total_data, model=riny_model)
+# the predictors serve the registry's current versions (the saved models above until one is promoted)
+# and are only loaded once the Model Calculator needs them; promoted versions are swapped in in the background
+registry = ModelRegistry(registry_dir)
+yur = YURModel(total_data, model=HotSwapPredictor(registry, 'yur', fallback_path=yur_model_path).start())
+riny = RINYModel(total_data, model=HotSwapPredictor(registry, 'riny', fallback_path=riny_model_path).start())
 
-total_data['YUR_Prediction'] = yur.linreg.predict(total_data)
-total_data['RINY_prediction'] = riny.logreg.predict(total_data)
-total_data['RINY_prediction_probability'] = riny.logreg.predict_proba(total_data)[1].values
+# predictions written by the data refresh job, scored here in one pass only if they are missing or were made from
+# another table or other model versions than the ones served here, and shared with both models so they never score
+# the table again
+pred_frame = PredictionFrame(total_data, riny.logreg, yur.linreg,
+                             preds=load_predictions(total_data, total_data_path, riny.logreg, yur.linreg))
+riny.pred_frame = yur.pred_frame = pred_frame
+preds = pred_frame.get()
+for column in prediction_columns:
+    total_data[column] = preds[column].values
+
+
+# the table, predictions and Visualizer are replaced together by swap_in, never changed in place, so callbacks
+# only ever see the old or the new ones
+swap_lock = threading.Lock()
+
+
+# makes a new table, prediction frame and Visualizer the ones served; the caller holds swap_lock
+def swap_in(new_total_data, new_pred_frame, new_vis):
+    global total_data, pred_frame, vis, available_years
+    data_version = get_data_version(new_total_data)
+    new_vis.schema = schema_registry.get(new_total_data, data_version)
+    total_data, pred_frame, vis = new_total_data, new_pred_frame, new_vis
+    available_years = get_available_years(new_total_data)
+    riny.pred_frame = yur.pred_frame = new_pred_frame
+    figure_cache.set_data_version(data_version)
+    figure_cache.clear()
+
+
+# after a model swap, rescores the table with the swapped model on the watcher thread, recomputing the
+# normalization statistics of only its prediction columns
+def on_model_swap(predictor):
+    model = riny if predictor.task == 'riny' else yur
+    model.pred_cache.clear()
+    with swap_lock:
+        new_total_data = total_data.copy()
+        new_pred_frame = PredictionFrame(new_total_data, riny.logreg, yur.linreg,
+                                         preds=pred_frame.get().drop(columns=task_columns[predictor.task]))
+        swapped_preds = new_pred_frame.get()
+        for swapped_column in task_columns[predictor.task]:
+            new_total_data[swapped_column] = swapped_preds[swapped_column].values
+        swap_in(new_total_data, new_pred_frame, vis.with_columns(new_total_data, task_columns[predictor.task]))
+
+
+# picks up the table when the data refresh job writes it again
+# months only appended to it (the usual monthly update) are scored on their own and their normalization statistics
+# merged into the cached ones, anything else (Ex. revised months) rebuilds the predictions and the Visualizer
+def refresh_data():
+    global data_mtime
+    mtime = os.path.getmtime(total_data_path)
+    if mtime == data_mtime:
+        return False
+    loaded = load_total_data(total_data_path)
+    with swap_lock:
+        n_existing = len(total_data)
+        if len(loaded) > n_existing and loaded.iloc[:n_existing].equals(total_data[loaded.columns]):
+            new_rows = loaded.iloc[n_existing:].reset_index(drop=True)
+            new_preds = compute_predictions(new_rows, riny.logreg, yur.linreg)
+            for column in prediction_columns:
+                new_rows[column] = new_preds[column].values
+            new_vis = vis.with_rows(new_rows)
+            new_pred_frame = PredictionFrame(new_vis.total_data, riny.logreg, yur.linreg,
+                                             preds=pd.concat([pred_frame.get(), new_preds], ignore_index=True))
+        else:
+            new_pred_frame = PredictionFrame(loaded, riny.logreg, yur.linreg,
+                                             preds=load_predictions(loaded, total_data_path, riny.logreg, yur.linreg))
+            new_preds = new_pred_frame.get()
+            for column in prediction_columns:
+                loaded[column] = new_preds[column].values
+            new_vis = Visualizer(loaded)
+        swap_in(new_vis.total_data, new_pred_frame, new_vis)
+        data_mtime = mtime
+    return True
+
+
+def watch_data():
+    while True:
+        time.sleep(data_poll_interval)
+        try:
+            refresh_data()
+        except Exception as e:
+            # a table read while it is still being written is read again at the next check
+            print('Could not refresh the total table:', e)
+
+
+riny.logreg.add_listener(on_model_swap)
+yur.linreg.add_listener(on_model_swap)
 
 vis = Visualizer(total_data)
 
-available_years = list(vis.total_data.date.values)
-available_years = list(set([datetime.datetime.strptime(x, '%Y-%m-%d').year for x in available_years]))
-
-fig = vis.makePlot(['yield_diff', '36_mo_cpi_change_all'])
-
-riny_preds = riny.get_present_data()
-yur_preds = yur.get_present_data()
-total_preds = riny_preds.merge(yur_preds, how='inner', on='date')
-total_preds.columns = ['Date', 'Recession in Next Year Binary',
-                       'Recession in Next Year Probability', 'Years Until Recession']
-total_preds['Recession in Next Year Probability'] = round(total_preds['Recession in Next Year Probability'], 3)
-total_preds['Years Until Recession'] = total_preds['Years Until Recession'].apply(lambda x: float('{:,.3}'.format(x)))
-
-riny_rec_val = total_preds.iloc[-1]['Recession in Next Year Probability']
-riny_rec_pred = (datetime.datetime.today() +
-                 datetime.timedelta(int(365 * ((1 / riny_rec_val) - 1)))).strftime('%Y-%m-%d')
-
-yur_rec_val = total_preds.iloc[-1]['Years Until Recession']
-yur_rec_pred = (datetime.datetime.today() +
-                datetime.timedelta(int(365 * yur_rec_val))).strftime('%Y-%m-%d')
-
-log_pred = riny.make_pred(0, 0, 0, 0)
-lin_pred = yur.make_pred(0, 0, 0, 0)
-if riny_rec_val < 0.5:
-    likelihood_string = 'low'
-elif yur_rec_val <= 1:
-    likelihood_string = 'high'
-elif riny_rec_val < 0.92:
-    likelihood_string = 'possible'
-else:
-    likelihood_string = 'high'
-
-most_recent_data = vis.total_data.iloc[-1]
-
-layout = html.Div(
-    [
-        dcc.Markdown('For variable descriptions click [here](/data-description)', style={"margin-top": "8%"}),
-        html.Div(
-            [
-                html.Div(
-                    [
-                        html.Label("Values to Plot"),
-                        dcc.Dropdown(
-                            id="variable-dropdown",
-                            options=[
-                                {"label": s.replace("_", " ").title(), "value": s} for s in
-                                list(vis.total_data.columns)
-                            ],
-                            className="dropdown",
-                            value=['yield_diff', '36_mo_cpi_change_all'],
-                            multi=True,
-                            persistence=True
-                        )
-                    ], style={"width": '25%', 'zIndex': 2147483647}
-                ),
-                html.Div(
-                    [
-                        html.Label("Horizontal Axis Variable"),
-                        dcc.Dropdown(
-                            id="x-dropdown",
-                            options=[
-                                {"label": s.replace("_", " ").title(), "value": s} for s in
-                                list(vis.total_data.columns)
-                            ],
-                            value='date',
-                            className="dropdown",
-                            persistence=True
-                        )
-                    ], style={"width": '25%', 'zIndex': 2147483647}
-                ),
-                html.Div(
-                    [
-                        html.H2("Latest Predictions",
-                                style={"text-decoration": "underline", "textAlign": "center"}),
-                        html.H4("RINY Predicts Recession Starting:", style={"textAlign": "center"}),
-                        html.H3(riny_rec_pred, style={"textAlign": "center"}),
-                        html.Br(),
-                        html.H4("YUR Predicts Recession Starting:", style={"textAlign": "center"}),
-                        html.H3(yur_rec_pred, style={"textAlign": "center"}),
-                    ], style={"margin-left": "0.5%", "border": "2px black solid", "margin-top": "-17%",
-                              "width": "250px"}
-                ),
-                html.Div(
-                    [
-                        html.H2("What to Know", style={"text-decoration": "underline",
-                                                       "textAlign": "center"}),
-                        dcc.Markdown('''
-                            - The **RINY** (recession in next year) Model predicts whether or not there will be a
-                              recession in the next year, and returns a value of either 0 (there will not be) or 1
-                              (there will be) as well as the probability of a recession occurring. It has an accuracy
-                              score of 98%, a recall score of 95%, a precision score of 98%, and an f1 score of 96%
-                              all on new data.
-                            - The **YUR** (years until recession) Model predicts the number of years until the start of
-                              the next recession. This model has an R2 value of 0.94 on new data.
-
-                            *Current scores indicate a **''' + likelihood_string + '''** likelihood of a recession
-                            within the next year*
-                        '''),
-                    ], style={"margin-left": "0.5%", "border": "2px black solid", "width": '30%', "margin-top": "-17%"}
-                ),
-            ],
-            className="row",
-            style={"display": 'flex'}
-        ),
-        dcc.Checklist([{"label": 'Include Data During Recessions ' +
-                                 '(Notes: Model does not look at this data, line plots include this data regardless)',
-                        "value": 1}],
-                      id='recession-checklist', style={"zIndex": 2147483648, "margin-bottom": "2%"},
-                      persistence=True),
-        dcc.Graph(id='variable-plot', figure=fig, style={"position": "relative", "margin-top": "-2.5%"},
-                  config={'displayModeBar': False}),
-        dcc.RangeSlider(min(available_years), max(available_years), 1,
-                        value=[min(available_years), max(available_years)],
-                        marks={year: str(year) for year in range(min(available_years), max(available_years) + 1)},
-                        id='year-range-slider'),
-        html.Br(),
-        html.Div(
-            [
-                html.Div(
-                    [
-                        html.H2("Past Year Predictions"),
-                        html.H4("Available as necessary data becomes available"),
-                        dash_table.DataTable(total_preds.to_dict('records'),
-                                             [{"name": i, "id": i} for i in total_preds.columns]),
-                    ], style={"width": '50%'}
-                ),
-                html.Div(
-                    [
-                        html.H2("Model Calculator", style={"text-decoration": "underline", "margin-left": "1%"}),
-                        dcc.Markdown("#### Customize the boxes below to see how the model operates. Have some fun with "
-                                     "it! [Data Descriptions](/data-description)",
-                                     style={"margin-left": "1%"}),
-                        html.Div(
-                            [
-                                html.Label('1 Year Housing Climb Change',
-                                           style={"font-size": "12px"}),
-                                html.Label('3 Year CPI Change', style={"font-size": "12px", "margin-left": "3.5%"}),
-                                html.Label('Yield Curve Difference', style={"font-size": "12px", "margin-left": "5%"}),
-                                html.Label('Years Since Recession', style={"font-size": "12px", "margin-left": "4.5%"}),
-                                html.Label('Unemployment Rate', style={"font-size": "12px", "margin-left": "5%"})
-                            ], style={"verticalAlign": "middle"}
-                        ),
-                        html.Div(
-                            [
-                                dcc.Input(id='housing-change-input', type="number", value=0,
-                                          style={"width": "7%", "margin-left": "7%"}, persistence=True),
-                                dcc.Input(id='cpi-change-input', type="number", value=0,
-                                          style={"width": "7%", "margin-left": "11.2%"}, persistence=True),
-                                dcc.Input(id='yield-diff', type="number", value=0,
-                                          style={"width": "7%", "margin-left": "11.2%"}, persistence=True),
-                                dcc.Input(id='years-since-recession', type="number", value=0,
-                                          style={"width": "7%", "margin-left": "11.2%"}, persistence=True),
-                                dcc.Input(id='un-rate', type="number", value=0,
-                                          style={"width": "7%", "margin-left": "11.2%"}, persistence=True)
-                            ], style={"verticalAlign": "middle"}
-                        ),
-                        html.Div(
-                            [
-                                html.Label('Current Value: ' + str(round(most_recent_data['housing_climb_change'], 3)),
-                                           style={"font-size": "12px", "margin-left": "3%"}),
-                                html.Label('Current Value: ' + str(round(most_recent_data['36_mo_cpi_change_all'], 3)),
-                                           style={"font-size": "12px", "margin-left": "5.5%"}),
-                                html.Label('Current Value: ' + str(round(most_recent_data['yield_diff'], 3)),
-                                           style={"font-size": "12px", "margin-left": "5.5%"}),
-                                html.Label('Current Value: ' + str(round(most_recent_data['years_since_recession'], 3)),
-                                           style={"font-size": "12px", "margin-left": "5.5%"}),
-                                html.Label('Current Value: ' + str(round(most_recent_data['un_rate'], 3)),
-                                           style={"font-size": "12px", "margin-left": "6.5%"})
-                            ], style={"verticalAlign": "middle"}
-                        ),
-                        html.H3(id="log-pred", style={"margin-left": "1%"}),
-                        html.H3(id="lin-pred", style={"margin-left": "1%"}),
-                    ], style={"border": "2px black solid",
-                              "margin-top": "10%",
-                              "width": "50%",
-                              "margin-left": "1%",
-                              "max-width": "720px",
-                              "min-width": "720px"}
-                ),
-            ], style={"display": 'flex', "margin-top": "5%"}
-        ),
-        html.Div(
-            [
-                html.H2("Credits", style={"text-decoration": "underline", "margin-left": "1%"}),
-                dcc.Markdown("""
-                    Data is obtained from a combination of [St. Louis Federal Reserve of Economic Data
-                    (FRED)](https://fred.stlouisfed.org/), the [List of recessions in the United States](
-                    https://en.wikipedia.org/wiki/List_of_recessions_in_the_United_States) Wikipedia page,
-                    and [multpl.com](https://www.multpl.com/s-p-500-historical-prices/table/by-month).
-
-                    Data shown here was often aggregated or calculated for use in the model and may not
-                    be a direct representation of the source it was pulled from.
-
-                    Crediting the autogluon package with the technology utilized to create these models.
-
-                    I would also like to acknowledge the mortada [fredapi](
-                    https://github.com/mortada/fredapi) package for allowing simple retrievals of some
-                    FRED data.""", style={"margin-left": "3%"})
-            ], style={"border": "2px black solid",
-                      "margin-top": "1%",
-                      "width": "80%",
-                      "margin-left": "1%",
-                      "margin-bottom": "1%"},
-        ),
-    ]
-)
+# figures of the variable plot, keyed by the normalized plot inputs and the version of the plotted data
+figure_cache_max_mb = 64
+# the figure cache's hit rate and size are logged every this many plot requests
+cache_log_interval = 100
+# the views sent to the browser built in the background at startup, as (variables, x)
+warm_views = [(['yield_diff', '36_mo_cpi_change_all'], 'date')]
 
 
-@callback(
-    Output("variable-plot", "figure"),
-    Input("variable-dropdown", "value"),
-    Input("x-dropdown", "value"),
-    Input("year-range-slider", "value"),
-    Input("recession-checklist", "value")
-)
-def update_figure(variables, x, year_range, in_rec):
+# a hash of the plotted table, which changes when the data is rebuilt or a model is swapped
+def get_data_version(data):
+    return int(pd.util.hash_pandas_object(data, index=False).sum())
+
+
+figure_cache = FigureCache(max_bytes=figure_cache_max_mb * 2 ** 20, data_version=get_data_version(total_data))
+
+# each column's kind, range and display label, rebuilt when the data version changes
+schema_registry = SchemaRegistry(prediction_columns)
+
+
+# the schema of the plotted table, which is swapped in along with it
+def get_schema():
+    return vis.schema
+
+
+vis.schema = schema_registry.get(vis.total_data, figure_cache.data_version)
+
+# the years of the table, the range of the year slider and of the drawn figures
+def get_available_years(data):
+    return sorted(set(datetime.datetime.strptime(x, '%Y-%m-%d').year for x in data.date.values))
+
+
+available_years = get_available_years(vis.total_data)
+
+
+# the latest predictions shown on the page, from the table served when the page is loaded, as
+# (the predictions for the most recent year, the RINY and YUR predicted recession starts, the likelihood text)
+def get_latest_predictions(data):
+    # predictions for the most recent year, which has no recession_in_next_year label yet
+    total_preds = data[data['recession_in_next_year'].isnull()]
+    total_preds = total_preds[['date', 'RINY_prediction', 'RINY_prediction_probability',
+                               'YUR_Prediction']].reset_index(drop=True)
+    total_preds.columns = ['Date', 'Recession in Next Year Binary',
+                           'Recession in Next Year Probability', 'Years Until Recession']
+    total_preds['Recession in Next Year Probability'] = round(total_preds['Recession in Next Year Probability'], 3)
+    total_preds['Years Until Recession'] = \
+        total_preds['Years Until Recession'].apply(lambda x: float('{:,.3}'.format(x)))
+
+    riny_rec_val = total_preds.iloc[-1]['Recession in Next Year Probability']
+    riny_rec_pred = (datetime.datetime.today() +
+                     datetime.timedelta(int(365 * ((1 / riny_rec_val) - 1)))).strftime('%Y-%m-%d')
+
+    yur_rec_val = total_preds.iloc[-1]['Years Until Recession']
+    yur_rec_pred = (datetime.datetime.today() +
+                    datetime.timedelta(int(365 * yur_rec_val))).strftime('%Y-%m-%d')
+
+    if riny_rec_val < 0.5:
+        likelihood_string = 'low'
+    elif yur_rec_val <= 1:
+        likelihood_string = 'high'
+    elif riny_rec_val < 0.92:
+        likelihood_string = 'possible'
+    else:
+        likelihood_string = 'high'
+    return total_preds, riny_rec_pred, yur_rec_pred, likelihood_string
+
+
+# the page is built on every load from the table served at the time, so a refreshed table or a swapped model
+# shows up on the next load
+def layout():
+    # read once, so the whole page is built from the same table even if it is swapped meanwhile
+    page_vis, page_years = vis, available_years
+    total_preds, riny_rec_pred, yur_rec_pred, likelihood_string = get_latest_predictions(page_vis.total_data)
+    most_recent_data = page_vis.total_data.iloc[-1]
+    return html.Div(
+        [
+            dcc.Markdown('For variable descriptions click [here](/data-description)', style={"margin-top": "8%"}),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            html.Label("Values to Plot"),
+                            dcc.Dropdown(
+                                id="variable-dropdown",
+                                options=page_vis.schema.get_options(),
+                                className="dropdown",
+                                value=['yield_diff', '36_mo_cpi_change_all'],
+                                multi=True,
+                                persistence=True
+                            )
+                        ], style={"width": '25%', 'zIndex': 2147483647}
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Horizontal Axis Variable"),
+                            dcc.Dropdown(
+                                id="x-dropdown",
+                                options=page_vis.schema.get_options(),
+                                value='date',
+                                className="dropdown",
+                                persistence=True
+                            )
+                        ], style={"width": '25%', 'zIndex': 2147483647}
+                    ),
+                    html.Div(
+                        [
+                            html.H2("Latest Predictions",
+                                    style={"text-decoration": "underline", "textAlign": "center"}),
+                            html.H4("RINY Predicts Recession Starting:", style={"textAlign": "center"}),
+                            html.H3(riny_rec_pred, style={"textAlign": "center"}),
+                            html.Br(),
+                            html.H4("YUR Predicts Recession Starting:", style={"textAlign": "center"}),
+                            html.H3(yur_rec_pred, style={"textAlign": "center"}),
+                        ], style={"margin-left": "0.5%", "border": "2px black solid", "margin-top": "-17%",
+                                  "width": "250px"}
+                    ),
+                    html.Div(
+                        [
+                            html.H2("What to Know", style={"text-decoration": "underline",
+                                                           "textAlign": "center"}),
+                            dcc.Markdown('''
+                                - The **RINY** (recession in next year) Model predicts whether or not there will be
+                                  a recession in the next year, and returns a value of either 0 (there will not be) or
+                                  1 (there will be) as well as the probability of a recession occurring. It has an
+                                  accuracy score of 98%, a recall score of 95%, a precision score of 98%, and an f1
+                                  score of 96% all on new data.
+                                - The **YUR** (years until recession) Model predicts the number of years until the
+                                  start of the next recession. This model has an R2 value of 0.94 on new data.
+
+                                *Current scores indicate a **''' + likelihood_string + '''** likelihood of a recession
+                                within the next year*
+                            '''),
+                        ], style={"margin-left": "0.5%", "border": "2px black solid", "width": '30%',
+                                  "margin-top": "-17%"}
+                    ),
+                ],
+                className="row",
+                style={"display": 'flex'}
+            ),
+            dcc.Checklist([{"label": 'Include Data During Recessions ' +
+                                     '(Notes: Model does not look at this data, line plots include this data '
+                                     'regardless)',
+                            "value": 1}],
+                          id='recession-checklist', style={"zIndex": 2147483648, "margin-bottom": "2%"},
+                          persistence=True),
+            # the plotted columns and the figure for all years, filtered in the browser, see assets/plot_filter.js
+            dcc.Store(id='plot-store'),
+            # drawn by filter_figure from the plot-store once the page loads
+            dcc.Graph(id='variable-plot', style={"position": "relative", "margin-top": "-2.5%"},
+                      config={'displayModeBar': False}),
+            dcc.RangeSlider(min(page_years), max(page_years), 1,
+                            value=[min(page_years), max(page_years)],
+                            marks={year: str(year) for year in range(min(page_years), max(page_years) + 1)},
+                            id='year-range-slider'),
+            html.Br(),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            html.H2("Past Year Predictions"),
+                            html.H4("Available as necessary data becomes available"),
+                            dash_table.DataTable(total_preds.to_dict('records'),
+                                                 [{"name": i, "id": i} for i in total_preds.columns]),
+                        ], style={"width": '50%'}
+                    ),
+                    html.Div(
+                        [
+                            html.H2("Model Calculator", style={"text-decoration": "underline", "margin-left": "1%"}),
+                            dcc.Markdown("#### Customize the boxes below to see how the model operates. Have some fun "
+                                         "with it! [Data Descriptions](/data-description)",
+                                         style={"margin-left": "1%"}),
+                            html.Div(
+                                [
+                                    html.Label('1 Year Housing Climb Change',
+                                               style={"font-size": "12px"}),
+                                    html.Label('3 Year CPI Change', style={"font-size": "12px", "margin-left": "3.5%"}),
+                                    html.Label('Yield Curve Difference',
+                                               style={"font-size": "12px", "margin-left": "5%"}),
+                                    html.Label('Years Since Recession',
+                                               style={"font-size": "12px", "margin-left": "4.5%"}),
+                                    html.Label('Unemployment Rate', style={"font-size": "12px", "margin-left": "5%"})
+                                ], style={"verticalAlign": "middle"}
+                            ),
+                            html.Div(
+                                [
+                                    dcc.Input(id='housing-change-input', type="number", value=0,
+                                              style={"width": "7%", "margin-left": "7%"}, persistence=True),
+                                    dcc.Input(id='cpi-change-input', type="number", value=0,
+                                              style={"width": "7%", "margin-left": "11.2%"}, persistence=True),
+                                    dcc.Input(id='yield-diff', type="number", value=0,
+                                              style={"width": "7%", "margin-left": "11.2%"}, persistence=True),
+                                    dcc.Input(id='years-since-recession', type="number", value=0,
+                                              style={"width": "7%", "margin-left": "11.2%"}, persistence=True),
+                                    dcc.Input(id='un-rate', type="number", value=0,
+                                              style={"width": "7%", "margin-left": "11.2%"}, persistence=True)
+                                ], style={"verticalAlign": "middle"}
+                            ),
+                            html.Div(
+                                [
+                                    html.Label('Current Value: ' +
+                                               str(round(most_recent_data['housing_climb_change'], 3)),
+                                               style={"font-size": "12px", "margin-left": "3%"}),
+                                    html.Label('Current Value: ' +
+                                               str(round(most_recent_data['36_mo_cpi_change_all'], 3)),
+                                               style={"font-size": "12px", "margin-left": "5.5%"}),
+                                    html.Label('Current Value: ' +
+                                               str(round(most_recent_data['yield_diff'], 3)),
+                                               style={"font-size": "12px", "margin-left": "5.5%"}),
+                                    html.Label('Current Value: ' +
+                                               str(round(most_recent_data['years_since_recession'], 3)),
+                                               style={"font-size": "12px", "margin-left": "5.5%"}),
+                                    html.Label('Current Value: ' +
+                                               str(round(most_recent_data['un_rate'], 3)),
+                                               style={"font-size": "12px", "margin-left": "6.5%"})
+                                ], style={"verticalAlign": "middle"}
+                            ),
+                            html.H3(id="log-pred", style={"margin-left": "1%"}),
+                            html.H3(id="lin-pred", style={"margin-left": "1%"}),
+                        ], style={"border": "2px black solid",
+                                  "margin-top": "10%",
+                                  "width": "50%",
+                                  "margin-left": "1%",
+                                  "max-width": "720px",
+                                  "min-width": "720px"}
+                    ),
+                ], style={"display": 'flex', "margin-top": "5%"}
+            ),
+            html.Div(
+                [
+                    html.H2("Credits", style={"text-decoration": "underline", "margin-left": "1%"}),
+                    dcc.Markdown("""
+                        Data is obtained from a combination of [St. Louis Federal Reserve of Economic Data
+                        (FRED)](https://fred.stlouisfed.org/), the [List of recessions in the United States](
+                        https://en.wikipedia.org/wiki/List_of_recessions_in_the_United_States) Wikipedia page,
+                        and [multpl.com](https://www.multpl.com/s-p-500-historical-prices/table/by-month).
+
+                        Data shown here was often aggregated or calculated for use in the model and may not
+                        be a direct representation of the source it was pulled from.
+
+                        Crediting the autogluon package with the technology utilized to create these models.
+
+                        I would also like to acknowledge the mortada [fredapi](
+                        https://github.com/mortada/fredapi) package for allowing simple retrievals of some
+                        FRED data.""", style={"margin-left": "3%"})
+                ], style={"border": "2px black solid",
+                          "margin-top": "1%",
+                          "width": "80%",
+                          "margin-left": "1%",
+                          "margin-bottom": "1%"},
+            ),
+        ]
+    )
+
+
+# returns which Visualizer plot the inputs are drawn with
+def get_plot_kind(variables, x):
     if len(variables) == 0:
-        fig = vis.scatPlot(variables, x, start_date=str(year_range[0]) + '-01-01',
-                           end_date=str(year_range[1]) + '-12-01', in_rec=in_rec)
+        return 'scatter'
     elif (len(variables) == 1) & (variables[0] == x):  # if one variable --> 1 var histogram
-        fig = vis.soloHist(x, start_date=str(year_range[0]) + '-01-01',
-                           end_date=str(year_range[1]) + '-12-01', in_rec=in_rec)
+        return 'solo_hist'
     elif x == 'date':  # if date is on x --> line plot
-        fig = vis.makePlot(variables, x=x, start_date=str(year_range[0]) + '-01-01',
-                           end_date=str(year_range[1]) + '-12-01')
-    elif (((vis.total_data[x].values == 0) | (vis.total_data[x].values == 1) |
-           (vis.total_data[x].values != vis.total_data[x].values)).all()):
+        return 'line'
+    elif get_schema().is_binary(x):
         # if binary x and one y
-        fig = vis.histPlot(variables, x, start_date=str(year_range[0]) + '-01-01',
-                           end_date=str(year_range[1]) + '-12-01', in_rec=in_rec)
+        return 'hist'
+    return 'scatter'
 
-    else:
-        fig = vis.scatPlot(variables, x, start_date=str(year_range[0]) + '-01-01',
-                           end_date=str(year_range[1]) + '-12-01', in_rec=in_rec)
-    return fig
+
+# plotly express figures drawn at the same time (Ex. the cache warmup and the first request) can fail while the
+# shared default template is first loaded, so figures are drawn one at a time
+draw_lock = threading.Lock()
+
+
+# draws the figure for all years with recessions included, the browser filters it (see get_plot_payload)
+def make_figure(kind, variables, x):
+    # read once, so the whole figure is drawn from the same table even if a model is swapped meanwhile
+    plot_vis, plot_years = vis, available_years
+    start_date = str(min(plot_years)) + '-01-01'
+    end_date = str(max(plot_years)) + '-12-01'
+    with draw_lock:
+        if kind == 'solo_hist':
+            return plot_vis.soloHist(x, start_date=start_date, end_date=end_date, in_rec=[1])
+        elif kind == 'line':
+            return plot_vis.makePlot(variables, x=x, start_date=start_date, end_date=end_date)
+        elif kind == 'hist':
+            return plot_vis.histPlot(variables, x, start_date=start_date, end_date=end_date, in_rec=[1])
+        return plot_vis.scatPlot(variables, x, start_date=start_date, end_date=end_date, in_rec=[1])
+
+
+# the cache key of the plotted variables, the year range and recession checklist never reach the server
+def get_figure_key(variables, x):
+    return get_plot_kind(variables, x), tuple(variables), x
+
+
+# returns the figure from the cache, drawing it on a miss
+def get_figure(variables, x):
+    key = get_figure_key(variables, x)
+    return figure_cache.get(key, lambda: make_figure(key[0], variables, x))
+
+
+# the figure's row filtering is done in the browser: the server sends the figure for all years including
+# recessions, the columns it was drawn from, and which rows each trace and shape belongs to,
+# and only hears from the browser again when the plotted variables change
+def get_plot_payload(variables, x):
+    kind = get_plot_kind(variables, x)
+    plot_vis = vis
+    figure = get_figure(variables, x)
+    columns = list(dict.fromkeys(['date', 'in_recession', x] + list(variables)))
+    payload = {'kind': kind, 'x': x, 'variables': list(variables), 'figure': figure,
+               'columns': {column: [None if value != value else value
+                                    for value in plot_vis.total_data[column].tolist()] for column in columns}}
+    if kind == 'hist':
+        # the x value of the rows in each trace, in the order px draws them
+        payload['groups'] = pd.unique(plot_vis.total_data[x].dropna()).tolist()
+    if kind == 'line':
+        # the recession each shape belongs to, None for the zero line
+        recession_ranges = dict(zip(recession_starts, recession_ends))
+        payload['shape_ranges'] = []
+        for shape in figure['layout'].get('shapes', []):
+            if shape['type'] != 'rect':
+                payload['shape_ranges'].append(None)
+            elif shape['x0'] in recession_ranges:
+                payload['shape_ranges'].append([shape['x0'], shape['x1']])
+            else:
+                payload['shape_ranges'].append([shape['x1'], recession_ranges[shape['x1']]])
+    return payload
+
+
+def warm_figure_cache():
+    views = []
+    for variables, x in warm_views:
+        key = get_figure_key(variables, x)
+        views.append((key, functools.partial(make_figure, key[0], variables, x)))
+    figure_cache.warm(views)
+
+
+threading.Thread(target=warm_figure_cache, name='figure-cache-warmup', daemon=True).start()
+threading.Thread(target=watch_data, name='total-data-watcher', daemon=True).start()
+
+
+@callback(
+    Output("plot-store", "data"),
+    Input("variable-dropdown", "value"),
+    Input("x-dropdown", "value")
+)
+def update_plot_store(variables, x):
+    payload = get_plot_payload(variables, x)
+    cache_info = figure_cache.info()
+    if (cache_info['hits'] + cache_info['misses']) % cache_log_interval == 0:
+        print('Figure cache:', cache_info)
+    return payload
+
+
+clientside_callback(
+    ClientsideFunction(namespace='plots', function_name='filter_figure'),
+    Output("variable-plot", "figure"),
+    Input("plot-store", "data"),
+    Input("year-range-slider", "value"),
+    Input("recession-checklist", "value")
+)
 
 
 @callback(
@@ -0,0 +1 @@
+# This file makes the CodeBase package importable by the tests when pytest is run from the repository root
@@ -0,0 +1,58 @@
+# This file tests the permutation importance in CodeBase/Model/feature_importance.py with a stub predictor
+import numpy as np
+import pandas as pd
+from CodeBase.Model import feature_importance
+
+
+class Metric:
+    name = 'accuracy'
+
+
+# a predictor that predicts y from the sign of a and b, so c does not matter
+class StubPredictor:
+    label = 'y'
+    eval_metric = Metric()
+
+    def __init__(self, path='stub_model'):
+        self.path = path
+
+    def evaluate(self, data, silent=True):
+        preds = ((data['a'] > 0) & (data['b'] > -1)).astype(int)
+        return {'accuracy': float((preds == data['y']).mean())}
+
+
+def get_data(rows=400):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'a': rng.normal(size=rows), 'b': rng.normal(size=rows), 'c': rng.normal(size=rows)})
+    data['y'] = ((data['a'] > 0) & (data['b'] > -1)).astype(int)
+    return data
+
+
+def test_compute_importance_serial():
+    importance = feature_importance.compute_importance(StubPredictor(), get_data(), n_jobs=1)
+    assert list(importance.index) == ['a', 'b', 'c']
+    assert importance.loc['c', 'importance'] == 0
+    assert importance.loc['a', 'importance'] > importance.loc['b', 'importance'] > 0
+
+
+# the spawned workers load the stub through this module, which they import by name
+def load_stub(path):
+    return StubPredictor(path)
+
+
+def test_compute_importance_parallel_matches_serial():
+    serial = feature_importance.compute_importance(StubPredictor(), get_data(), n_jobs=1)
+    parallel = feature_importance.compute_importance(StubPredictor(), get_data(), n_jobs=2, loader=load_stub)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_get_feature_importance_caches(tmp_path, monkeypatch):
+    calls = []
+    compute_importance = feature_importance.compute_importance
+    monkeypatch.setattr(feature_importance, 'compute_importance',
+                        lambda *args, **kwargs: calls.append(1) or compute_importance(*args, **kwargs))
+    predictor = StubPredictor(str(tmp_path / 'stub_model'))
+    first = feature_importance.get_feature_importance(predictor, get_data(), cache_dir=str(tmp_path), n_jobs=1)
+    second = feature_importance.get_feature_importance(predictor, get_data(), cache_dir=str(tmp_path), n_jobs=1)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first.astype(float), second.astype(float))
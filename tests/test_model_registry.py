@@ -0,0 +1,49 @@
+# This file tests promoting and rolling back versions in CodeBase/Model/model_registry.py with stub predictors
+import os
+import pytest
+import CodeBase.Model.model_registry as model_registry
+from CodeBase.Model.model_registry import ModelRegistry, HotSwapPredictor
+
+
+# stands in for LazyPredictor, counting the loads
+class StubPredictor:
+
+    loads = 0
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        StubPredictor.loads += 1
+        return self
+
+
+def make_registry(tmp_path):
+    saved_model = tmp_path / 'riny_model'
+    os.makedirs(saved_model)
+    (saved_model / 'predictor.pkl').write_text('riny')
+    return ModelRegistry(str(tmp_path / 'registry')), str(saved_model)
+
+
+def test_rollback_after_first_promotion_serves_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_registry, 'LazyPredictor', StubPredictor)
+    registry, saved_model = make_registry(tmp_path)
+    predictor = HotSwapPredictor(registry, 'riny', fallback_path=saved_model)
+    with pytest.raises(ValueError):
+        registry.rollback('riny')
+
+    version = registry.register('riny', saved_model)
+    registry.promote('riny', version)
+    assert predictor.refresh()
+    assert predictor.get_path() == registry.get_path('riny', version)
+
+    registry.rollback('riny')
+    assert registry.get_current('riny') is None
+    loads = StubPredictor.loads
+    assert predictor.refresh()
+    assert predictor.get_path() == saved_model
+    # the fallback was kept loaded as the previous predictor
+    assert StubPredictor.loads == loads
+
+    registry.rollback('riny')
+    assert registry.get_current('riny') == version
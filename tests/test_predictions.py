@@ -0,0 +1,88 @@
+# This file tests the prediction frame methods in CodeBase/Model/predictions.py with stub predictors
+import os
+import numpy as np
+import pandas as pd
+from CodeBase.Model.predictions import PredictionFrame, compute_predictions, write_predictions, load_predictions
+
+
+# a predictor with only the predict_proba method of a binary TabularPredictor
+class ProbaOnlyPredictor:
+
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+        self.calls = 0
+
+    def predict_proba(self, data):
+        self.calls += 1
+        return pd.DataFrame({0: 1 - self.probabilities, 1: self.probabilities}, index=data.index)
+
+
+class RegressionPredictor:
+
+    def predict(self, data):
+        return pd.Series(np.arange(len(data), dtype=float), index=data.index)
+
+
+def get_total_data():
+    return pd.DataFrame({'date': ['2000-01-01', '2000-02-01', '2000-03-01', '2000-04-01'],
+                         'un_rate': [4., 5., 6., 7.]}, index=[10, 11, 12, 13])
+
+
+def test_compute_predictions_with_predict_proba_only():
+    total_data = get_total_data()
+    preds = compute_predictions(total_data, ProbaOnlyPredictor(np.array([0.1, 0.5, 0.7, 0.49])),
+                                RegressionPredictor())
+    assert list(preds.index) == list(total_data.index)
+    assert list(preds['RINY_prediction']) == [0, 1, 1, 0]
+    assert preds['RINY_prediction'].dtype == np.int64
+    assert list(preds['RINY_prediction_probability']) == [0.1, 0.5, 0.7, 0.49]
+    assert list(preds['YUR_Prediction']) == [0., 1., 2., 3.]
+
+
+def test_compute_predictions_skips_missing_predictor():
+    preds = compute_predictions(get_total_data(), ProbaOnlyPredictor(np.array([0.1, 0.5, 0.7, 0.49])), None)
+    assert 'YUR_Prediction' not in preds.columns
+    assert list(preds['RINY_prediction']) == [0, 1, 1, 0]
+
+
+def test_prediction_frame_scores_once():
+    riny_predictor = ProbaOnlyPredictor(np.array([0.9, 0.2, 0.6, 0.3]))
+    frame = PredictionFrame(get_total_data(), riny_predictor, RegressionPredictor())
+    frame.get()
+    preds = frame.get()
+    assert riny_predictor.calls == 1
+    assert list(preds['RINY_prediction']) == [1, 0, 1, 0]
+
+
+# saves a stub model directory for predictor and points its path at it
+def save_stub_model(predictor, path, contents):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'predictor.pkl'), 'w') as f:
+        f.write(contents)
+    predictor.path = path
+    return predictor
+
+
+def test_saved_predictions_are_tied_to_the_table_and_model_versions(tmp_path):
+    total_data = get_total_data().reset_index(drop=True)
+    total_data_path = str(tmp_path / 'total_data.csv')
+    total_data.to_csv(total_data_path)
+    riny_predictor = save_stub_model(ProbaOnlyPredictor(np.array([0.9, 0.2, 0.6, 0.3])), str(tmp_path / 'riny'), 'a')
+    yur_predictor = save_stub_model(RegressionPredictor(), str(tmp_path / 'yur'), 'a')
+    assert load_predictions(total_data, total_data_path, riny_predictor, yur_predictor) is None
+
+    write_predictions(total_data, total_data_path, riny_predictor, yur_predictor)
+    preds = load_predictions(total_data, total_data_path, riny_predictor, yur_predictor)
+    assert list(preds['RINY_prediction']) == [1, 0, 1, 0]
+
+    # a model retrained in place, whatever its files' modification times
+    mtime = os.path.getmtime(os.path.join(yur_predictor.path, 'predictor.pkl'))
+    save_stub_model(yur_predictor, yur_predictor.path, 'b')
+    os.utime(os.path.join(yur_predictor.path, 'predictor.pkl'), (mtime - 60, mtime - 60))
+    assert load_predictions(total_data, total_data_path, riny_predictor, yur_predictor) is None
+
+    write_predictions(total_data, total_data_path, riny_predictor, yur_predictor)
+    assert load_predictions(total_data, total_data_path, riny_predictor, yur_predictor) is not None
+    total_data.loc[3, 'un_rate'] = 8.
+    total_data.to_csv(total_data_path)
+    assert load_predictions(total_data, total_data_path, riny_predictor, yur_predictor) is None